@@ -0,0 +1,20 @@
+import orjson
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson.
+
+    orjson handles dicts, lists, strings, numbers and UUIDs natively. Anything
+    else (Decimal, datetimes, lazy translation strings, querysets) falls back
+    to DRF's encoder, so responses match the stdlib renderer's output.
+    """
+
+    _fallback = JSONEncoder().default
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self._fallback, option=self.options)
@@ -20,18 +20,17 @@ def check_achievements(user):
     )
 
     # Get all non-special achievements that haven't been unlocked yet
-    candidates = Achievement.objects.exclude(
-        id__in=unlocked_ids
-    ).exclude(
-        requirement_type='special'
-    )
+    candidates = [
+        achievement for achievement in Achievement.catalogue()
+        if achievement.id not in unlocked_ids and achievement.requirement_type != 'special'
+    ]
 
-    if not candidates.exists():
+    if not candidates:
         return []
 
     # Gather counts lazily (only compute what's needed)
     counts = {}
-    needed_types = set(candidates.values_list('requirement_type', flat=True))
+    needed_types = {achievement.requirement_type for achievement in candidates}
 
     if 'trades_count' in needed_types:
         counts['trades_count'] = Trade.objects.filter(user=user).count()
@@ -91,30 +90,26 @@ def _calculate_realized_profit(user):
     Calculate total realized profit from completed sell trades.
     Profit = sum of (sell_price - avg_buy_price) * shares for each sell trade.
     """
-    sell_trades = Trade.objects.filter(user=user, trade_type='SELL')
-    if not sell_trades.exists():
-        return 0
+    # One ordered pass over the user's trades keeps running BUY totals per symbol,
+    # so each sell is priced against the buys executed up to it (BUY sorts before
+    # SELL at equal timestamps) without a query per sell.
+    rows = Trade.objects.filter(user=user).order_by(
+        'symbol', 'executed_at', 'trade_type'
+    ).values_list('symbol', 'trade_type', 'price', 'shares')
 
     total_profit = Decimal('0')
-
-    for sell in sell_trades:
-        # Find avg buy price from buy trades for this symbol executed before this sell
-        buy_trades = Trade.objects.filter(
-            user=user,
-            trade_type='BUY',
-            symbol=sell.symbol,
-            executed_at__lte=sell.executed_at,
-        )
-        if not buy_trades.exists():
-            continue
-
-        total_buy_cost = sum(t.price * t.shares for t in buy_trades)
-        total_buy_shares = sum(t.shares for t in buy_trades)
-        if total_buy_shares == 0:
-            continue
-
-        avg_buy_price = total_buy_cost / total_buy_shares
-        profit = (sell.price - avg_buy_price) * sell.shares
-        total_profit += profit
+    current_symbol = None
+    total_buy_cost = total_buy_shares = Decimal('0')
+
+    for symbol, trade_type, price, shares in rows:
+        if symbol != current_symbol:
+            current_symbol = symbol
+            total_buy_cost = total_buy_shares = Decimal('0')
+        if trade_type == 'BUY':
+            total_buy_cost += price * shares
+            total_buy_shares += shares
+        elif total_buy_shares:
+            avg_buy_price = total_buy_cost / total_buy_shares
+            total_profit += (price - avg_buy_price) * shares
 
     return float(total_profit)
@@ -108,11 +108,15 @@ class UserProfileAdmin(ModelAdmin):
     list_display = ['name', 'email', 'display_verified', 'display_buying_power', 'display_plan', 'display_admin', 'display_reports_link', 'created_at']
     search_fields = ['name', 'email', 'username']
     list_filter = ['plan', 'is_email_verified', 'is_2fa_enabled', 'is_admin', 'created_at']
-    readonly_fields = ['id', 'created_at', 'updated_at', 'password_changed_at', 'is_2fa_enabled']
+    readonly_fields = [
+        'id', 'created_at', 'updated_at', 'password_changed_at', 'is_2fa_enabled',
+        'total_trades', 'total_sells', 'winning_sells', 'realized_profit',
+    ]
     fieldsets = [
         ("Profile", {"fields": ["id", "name", "username", "email", "avatar_url"]}),
         ("Email Verification", {"fields": ["is_email_verified"]}),
         ("Account", {"fields": ["buying_power", "initial_balance", "plan"]}),
+        ("Trader Stats", {"fields": ["total_trades", "total_sells", "winning_sells", "realized_profit"]}),
         ("Admin", {"fields": ["is_admin"]}),
         ("Security", {"fields": ["password_changed_at", "is_2fa_enabled"]}),
         ("Timestamps", {"fields": ["created_at", "updated_at"]}),
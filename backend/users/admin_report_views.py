@@ -30,7 +30,7 @@ def _get_admin_and_target(request, username):
         )
 
     try:
-        target_user = UserProfile.objects.get(username=username)
+        target_user = UserProfile.objects.select_related('settings').get(username=username)
     except UserProfile.DoesNotExist:
         return None, None, Response(
             {'error': f'User "{username}" not found'}, status=404
@@ -11,7 +11,7 @@ from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.utils import timezone
 
-from .models import UserProfile, UserSettings, SiteSettings, generate_username
+from .models import UserProfile, UserSettings, SiteSettings, USERNAME_RE, generate_username
 from .email_service import send_verification_email, generate_verification_token
 from .achievement_service import award_special_achievement
 
@@ -82,7 +82,6 @@ class SignupView(APIView):
     permission_classes = []
 
     def post(self, request):
-        import re
         data = request.data
         name = data.get('name', '').strip()
         email = data.get('email', '').strip().lower()
@@ -104,7 +103,7 @@ class SignupView(APIView):
 
         # Validate username if provided
         if username:
-            if not re.match(r'^[a-z0-9](?:[a-z0-9-]{1,28}[a-z0-9])?$', username):
+            if not USERNAME_RE.match(username):
                 return Response(
                     {'error': 'Username must be 3-30 characters, lowercase letters, numbers, and hyphens. Cannot start or end with a hyphen.'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -396,8 +395,8 @@ class TwoFactorLoginVerifyView(APIView):
 
     def post(self, request):
         import hashlib
-        import pyotp
         from rest_framework_simplejwt.tokens import AccessToken
+        from .security_views import verify_totp
 
         temp_token = request.data.get('temp_token', '')
         code = request.data.get('code', '').strip()
@@ -433,12 +432,11 @@ class TwoFactorLoginVerifyView(APIView):
         # Try TOTP code first (6 digits)
         verified = False
         if len(code) == 6 and code.isdigit():
-            totp = pyotp.TOTP(user.totp_secret)
-            verified = totp.verify(code, valid_window=1)
+            verified = verify_totp(user.totp_secret, code)
 
         # Try backup code if TOTP didn't match
         if not verified:
-            code_hash = hashlib.sha256(code.encode()).hexdigest()
+            code_hash = hashlib.sha256(code.encode()).digest().hex()
             if code_hash in user.backup_codes:
                 # Remove used backup code
                 user.backup_codes.remove(code_hash)
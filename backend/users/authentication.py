@@ -9,6 +9,15 @@ from rest_framework_simplejwt.exceptions import InvalidToken
 from .models import UserProfile
 
 
+# Credential and token columns only the auth/security flows read. Left out of
+# the per-request user load; those views fetch them on access.
+AUTH_DEFERRED_FIELDS = (
+    'password', 'totp_secret', 'backup_codes',
+    'password_reset_token', 'password_reset_sent_at',
+    'email_verification_token', 'email_verification_sent_at',
+)
+
+
 class CookieJWTAuthentication(JWTAuthentication):
     """
     Reads the access_token from an HttpOnly cookie.
@@ -37,6 +46,6 @@ class CookieJWTAuthentication(JWTAuthentication):
             raise InvalidToken('Token contained no user_id claim')
 
         try:
-            return UserProfile.objects.get(id=user_id)
+            return UserProfile.objects.select_related('settings').defer(*AUTH_DEFERRED_FIELDS).get(id=user_id)
         except UserProfile.DoesNotExist:
             raise InvalidToken('User not found')
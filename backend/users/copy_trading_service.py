@@ -15,6 +15,8 @@ from django.utils import timezone
 from .models import (
     UserProfile, Trade, Holding, CopyRelationship, CopyTrade, TraderFollow,
 )
+from .trader_stats import record_trade
+from .user_cache import invalidate_user_cache
 
 logger = logging.getLogger(__name__)
 
@@ -142,6 +144,7 @@ def execute_copy_trade(copy_trade: CopyTrade):
                     total=total,
                     currency=copy_trade.source_trade.currency if copy_trade.source_trade else 'USD',
                 )
+                record_trade(trade)
 
                 _complete_copy(copy_trade, trade, price)
 
@@ -182,6 +185,7 @@ def execute_copy_trade(copy_trade: CopyTrade):
                     total=total,
                     currency=holding.currency,
                 )
+                record_trade(trade)
 
                 copy_trade.copy_shares = actual_shares
                 _complete_copy(copy_trade, trade, price)
@@ -274,6 +278,7 @@ def mirror_portfolio(copier: UserProfile, leader: UserProfile, allocated_funds:
                 trade_type='BUY', shares=shares, price=h.avg_cost,
                 total=total, currency=h.currency,
             )
+            record_trade(trade)
 
             CopyTrade.objects.create(
                 copy_relationship=rel,
@@ -294,6 +299,7 @@ def mirror_portfolio(copier: UserProfile, leader: UserProfile, allocated_funds:
         copier.save(update_fields=['buying_power'])
         rel.remaining_funds = remaining
         rel.save(update_fields=['remaining_funds'])
+        invalidate_user_cache(copier.id)
 
         return {
             'relationship': rel.to_dict(),
@@ -400,6 +406,7 @@ def _complete_copy(ct: CopyTrade, trade: Trade, price: Decimal):
     ct.executed_at = timezone.now()
     ct.copy_price = price
     ct.save()
+    invalidate_user_cache(trade.user_id)
 
 
 def _fail_copy(ct: CopyTrade, reason: str):
@@ -18,6 +18,7 @@ from .models import (
 from .copy_trading_service import (
     mirror_portfolio, process_pending_copy_trades, get_copy_performance,
 )
+from .user_cache import invalidate_user_cache
 
 
 DELAY_MAP = {'NONE': timedelta(0), '1H': timedelta(hours=1), '6H': timedelta(hours=6), '24H': timedelta(hours=24)}
@@ -166,6 +167,7 @@ class StartCopyTradingView(APIView):
         # Deduct from buying power
         user.buying_power -= allocated
         user.save(update_fields=['buying_power'])
+        invalidate_user_cache(user.id)
 
         return Response({'relationship': rel.to_dict()}, status=status.HTTP_201_CREATED)
 
@@ -217,6 +219,7 @@ class StopCopyTradingView(APIView):
         if rel.remaining_funds > 0:
             user.buying_power += rel.remaining_funds
             user.save(update_fields=['buying_power'])
+            invalidate_user_cache(user.id)
 
         return Response({
             'success': True,
@@ -19,6 +19,11 @@ def generate_verification_token():
     return secrets.token_urlsafe(48)
 
 
+def generate_password_reset_token():
+    """Generate a secure random token for password reset links (43 chars)."""
+    return secrets.token_urlsafe(32)
+
+
 def _get_smtp_connection(settings):
     """Create an SMTP connection from SiteSettings."""
     if settings.smtp_use_ssl:
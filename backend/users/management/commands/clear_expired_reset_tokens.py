@@ -0,0 +1,27 @@
+"""
+Management command to clear expired password reset tokens.
+Run via cron every hour: python manage.py clear_expired_reset_tokens
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import UserProfile
+from users.security_views import ResetPasswordView
+
+
+class Command(BaseCommand):
+    help = 'Clear password reset tokens older than the reset expiry window'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - ResetPasswordView.RESET_TOKEN_EXPIRY
+        count = (
+            UserProfile.objects
+            .filter(password_reset_sent_at__lt=cutoff)
+            .exclude(password_reset_token='')
+            .update(password_reset_token='')
+        )
+        if count > 0:
+            self.stdout.write(self.style.SUCCESS(f'Cleared {count} expired reset token(s)'))
+        else:
+            self.stdout.write('No expired reset tokens to clear')
@@ -12,6 +12,7 @@ from users.models import (
     UserProfile, UserSettings, Achievement, UserAchievement,
     Trade, Holding, Watchlist, PriceAlert, Friendship, LimitOrder,
 )
+from users.trader_stats import rebuild_trader_stats
 
 
 # Realistic stock data: (symbol, name, ~current price)
@@ -178,6 +179,7 @@ class Command(BaseCommand):
             ))
 
         Trade.objects.bulk_create(all_trades)
+        rebuild_trader_stats([user.id])
         self.stdout.write(f'  Created {len(all_trades)} trades')
 
         # --- Holdings ---
@@ -15,8 +15,12 @@ import logging
 from datetime import datetime, time
 from zoneinfo import ZoneInfo
 
+from django.core.cache import cache
+
 logger = logging.getLogger(__name__)
 
+MARKET_STATUS_CACHE_TIMEOUT = 15  # seconds
+
 
 MARKET_SCHEDULES = {
     'US': {
@@ -86,7 +90,8 @@ def is_market_open(market: str, symbol: str, now: datetime | None = None) -> dic
     Check whether a trade is allowed right now.
 
     Tries Finnhub market-status API first (holiday-aware). Falls back to
-    weekday + time-window logic when Finnhub is unreachable.
+    weekday + time-window logic when Finnhub is unreachable. Equity results
+    are cached per market for MARKET_STATUS_CACHE_TIMEOUT seconds.
 
     Args:
         market: 'US' or 'IN'
@@ -107,14 +112,26 @@ def is_market_open(market: str, symbol: str, now: datetime | None = None) -> dic
             'source': 'local',
         }
 
-    schedule = MARKET_SCHEDULES.get(market, MARKET_SCHEDULES['US'])
-    market_name = schedule['name']
-    display_hours = schedule['display_hours']
-
     # When `now` is passed (unit tests), skip Finnhub and use schedule only
     if now is not None:
         return _is_market_open_schedule(market, now)
 
+    # Equity status depends only on the market, so share it across symbols
+    # and requests for a few seconds
+    cache_key = f'mkt:{market}'
+    result = cache.get(cache_key)
+    if result is None:
+        result = _fetch_market_status(market)
+        cache.set(cache_key, result, MARKET_STATUS_CACHE_TIMEOUT)
+    return result
+
+
+def _fetch_market_status(market: str) -> dict:
+    """Live equity market status from Finnhub, falling back to the schedule."""
+    schedule = MARKET_SCHEDULES.get(market, MARKET_SCHEDULES['US'])
+    market_name = schedule['name']
+    display_hours = schedule['display_hours']
+
     # Try Finnhub for real-time status (includes holidays)
     try:
         from stocks.services import get_stock_service
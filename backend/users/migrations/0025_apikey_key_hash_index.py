@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-16 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0024_copyrelationship_copytrade_traderfollow'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(db_index=True, max_length=128),
+        ),
+    ]
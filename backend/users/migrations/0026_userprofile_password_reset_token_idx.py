@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-16 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0025_apikey_key_hash_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('password_reset_token', ''), _negated=True), fields=['password_reset_token'], name='user_pw_reset_token_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+"""
+Shrink UserProfile.password_reset_token to 43 chars (secrets.token_urlsafe(32)).
+- First clears outstanding 64-char reset tokens so the column can shrink
+- Then narrows the column
+"""
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+def clear_long_reset_tokens(apps, schema_editor):
+    """Invalidate pending reset links issued with the old 64-char tokens."""
+    UserProfile = apps.get_model('users', 'UserProfile')
+    (
+        UserProfile.objects
+        .annotate(token_len=Length('password_reset_token'))
+        .filter(token_len__gt=43)
+        .update(password_reset_token='')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0026_userprofile_password_reset_token_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_long_reset_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='password_reset_token',
+            field=models.CharField(blank=True, default='', max_length=43),
+        ),
+    ]
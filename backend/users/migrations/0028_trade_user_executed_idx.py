@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-16 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0027_shorten_password_reset_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', '-executed_at'], name='trades_user_executed_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-16 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0028_trade_user_executed_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='limitorder',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='limit_orders_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricealert',
+            index=models.Index(fields=['user', '-created_at'], name='alerts_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'trade_type', 'symbol', 'executed_at'], name='trades_user_type_sym_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='watchlist',
+            index=models.Index(fields=['user', '-starred', '-added_at'], name='watchlist_user_order_idx'),
+        ),
+    ]
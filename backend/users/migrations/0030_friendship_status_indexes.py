@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-16 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0029_add_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['status', 'from_user'], name='friendships_status_from_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['status', 'to_user'], name='friendships_status_to_idx'),
+        ),
+    ]
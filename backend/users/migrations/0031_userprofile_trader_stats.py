@@ -0,0 +1,81 @@
+"""
+Denormalize trader stats onto UserProfile.
+- Adds total_trades, total_sells, winning_sells and realized_profit
+- Backfills them from existing trades (each sell priced against the average
+  cost of the symbol's BUYs executed up to it)
+"""
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+PROFIT_QUANTUM = Decimal('0.0001')
+
+
+def backfill_trader_stats(apps, schema_editor):
+    UserProfile = apps.get_model('users', 'UserProfile')
+    Trade = apps.get_model('users', 'Trade')
+
+    stats = {}
+    current = None
+    buy_cost = buy_shares = Decimal('0')
+    rows = Trade.objects.order_by(
+        'user_id', 'symbol', 'executed_at', 'trade_type'
+    ).values_list('user_id', 'symbol', 'trade_type', 'price', 'shares')
+
+    for user_id, symbol, trade_type, price, shares in rows.iterator():
+        if (user_id, symbol) != current:
+            current = (user_id, symbol)
+            buy_cost = buy_shares = Decimal('0')
+        entry = stats.setdefault(user_id, [0, 0, 0, Decimal('0')])
+        entry[0] += 1
+        if trade_type == 'BUY':
+            buy_cost += price * shares
+            buy_shares += shares
+            continue
+        entry[1] += 1
+        if buy_shares > 0:
+            avg_buy_price = buy_cost / buy_shares
+            # Rounded per sell, matching the incremental updates
+            entry[3] += ((price - avg_buy_price) * shares).quantize(PROFIT_QUANTUM)
+            if price > avg_buy_price:
+                entry[2] += 1
+
+    for user_id, (total_trades, total_sells, winning_sells, realized_profit) in stats.items():
+        UserProfile.objects.filter(pk=user_id).update(
+            total_trades=total_trades,
+            total_sells=total_sells,
+            winning_sells=winning_sells,
+            realized_profit=realized_profit,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0030_friendship_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='total_trades',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='total_sells',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='winning_sells',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='realized_profit',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=20),
+        ),
+        migrations.RunPython(backfill_trader_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+"""
+Allow at most one Friendship row per pair of users, regardless of direction.
+- First removes mirrored duplicates (A->B and B->A), keeping the accepted or
+  oldest row of each pair
+- Then adds a unique constraint on (LEAST(from_user, to_user), GREATEST(...))
+"""
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+def drop_mirrored_friendships(apps, schema_editor):
+    Friendship = apps.get_model('users', 'Friendship')
+    kept = {}
+    duplicates = []
+    rows = Friendship.objects.order_by('created_at').values_list('id', 'from_user_id', 'to_user_id', 'status')
+    for friendship_id, from_user_id, to_user_id, status in rows:
+        pair = frozenset((from_user_id, to_user_id))
+        if pair not in kept:
+            kept[pair] = (friendship_id, status)
+        elif status == 'accepted' and kept[pair][1] != 'accepted':
+            duplicates.append(kept[pair][0])
+            kept[pair] = (friendship_id, status)
+        else:
+            duplicates.append(friendship_id)
+    Friendship.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0031_userprofile_trader_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_mirrored_friendships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Least('from_user', 'to_user'), django.db.models.functions.comparison.Greatest('from_user', 'to_user'), name='friendships_unique_pair'),
+        ),
+    ]
@@ -7,7 +7,9 @@ import random
 import string
 
 from django.db import models
+from django.db.models.functions import Greatest, Least
 from django.contrib.auth.hashers import make_password, check_password as django_check_password
+from django.core.cache import cache
 from django.core.validators import RegexValidator
 from django.utils import timezone
 import uuid
@@ -82,10 +84,14 @@ class SiteSettings(models.Model):
             return self.currency_buying_power[currency]
         return float(self.default_buying_power)
 
+    CACHE_KEY = 'site_settings'
+    CACHE_TIMEOUT = 300  # 5 minutes
+
     def save(self, *args, **kwargs):
         # Ensure only one instance exists
         self.pk = 1
         super().save(*args, **kwargs)
+        cache.delete(self.CACHE_KEY)
 
     @classmethod
     def load(cls):
@@ -93,9 +99,17 @@ class SiteSettings(models.Model):
         obj, _ = cls.objects.get_or_create(pk=1)
         return obj
 
+    @classmethod
+    def load_cached(cls):
+        """Like load(), but served from the cache for up to CACHE_TIMEOUT seconds."""
+        return cache.get_or_set(cls.CACHE_KEY, cls.load, cls.CACHE_TIMEOUT)
+
+
+USERNAME_PATTERN = r'^[a-z0-9](?:[a-z0-9-]{1,28}[a-z0-9])?$'
+USERNAME_RE = re.compile(USERNAME_PATTERN)
 
 USERNAME_VALIDATOR = RegexValidator(
-    regex=r'^[a-z0-9](?:[a-z0-9-]{1,28}[a-z0-9])?$',
+    regex=USERNAME_PATTERN,
     message='Username must be 3-30 characters, lowercase alphanumeric and hyphens, cannot start or end with a hyphen.',
 )
 
@@ -158,7 +172,7 @@ class UserProfile(models.Model):
 
     # Security - Password
     password_changed_at = models.DateTimeField(blank=True, null=True)
-    password_reset_token = models.CharField(max_length=64, blank=True, default='')
+    password_reset_token = models.CharField(max_length=43, blank=True, default='')
     password_reset_sent_at = models.DateTimeField(blank=True, null=True)
 
     # Security - 2FA
@@ -171,6 +185,12 @@ class UserProfile(models.Model):
     rank = models.CharField(max_length=30, default='Retail Trader')
     level = models.PositiveIntegerField(default=1)
 
+    # Trader stats, maintained as trades are recorded (see trader_stats.py)
+    total_trades = models.PositiveIntegerField(default=0)
+    total_sells = models.PositiveIntegerField(default=0)
+    winning_sells = models.PositiveIntegerField(default=0)
+    realized_profit = models.DecimalField(max_digits=20, decimal_places=4, default=0)
+
     # Reset tracking (prevent abuse)
     last_reset_at = models.DateTimeField(blank=True, null=True)
 
@@ -181,6 +201,13 @@ class UserProfile(models.Model):
 
     class Meta:
         db_table = 'user_profiles'
+        indexes = [
+            models.Index(
+                fields=['password_reset_token'],
+                condition=~models.Q(password_reset_token=''),
+                name='user_pw_reset_token_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.email})"
@@ -189,7 +216,11 @@ class UserProfile(models.Model):
         self.password = make_password(raw_password)
 
     def check_password(self, raw_password):
-        return django_check_password(raw_password, self.password)
+        def setter(raw_password):
+            # Rehash with the preferred hasher (e.g. legacy PBKDF2 -> Argon2)
+            self.set_password(raw_password)
+            self.save(update_fields=['password'])
+        return django_check_password(raw_password, self.password, setter)
 
     @property
     def initials(self):
@@ -199,6 +230,15 @@ class UserProfile(models.Model):
             return f"{parts[0][0]}{parts[1][0]}".upper()
         return self.name[:2].upper() if self.name else "??"
 
+    @property
+    def avatar_public_url(self):
+        """Avatar URL as served to the frontend (local uploads live under /media/), or None."""
+        if not self.avatar_url:
+            return None
+        if self.avatar_url.startswith(('http://', 'https://')):
+            return self.avatar_url
+        return f'/media/{self.avatar_url}'
+
     def to_dict(self):
         return {
             "id": str(self.id),
@@ -206,7 +246,7 @@ class UserProfile(models.Model):
             "username": self.username,
             "email": self.email,
             "initials": self.initials,
-            "avatarUrl": f'/media/{self.avatar_url}' if self.avatar_url and not self.avatar_url.startswith(('http://', 'https://')) else (self.avatar_url or None),
+            "avatarUrl": self.avatar_public_url,
             "buyingPower": float(self.buying_power),
             "initialBalance": float(self.initial_balance),
             "plan": self.plan,
@@ -299,9 +339,26 @@ class Achievement(models.Model):
     requirement_type = models.CharField(max_length=50)  # e.g., 'trades_count', 'profit_amount'
     requirement_value = models.IntegerField()
 
+    CACHE_KEY = 'achievement_catalogue'
+    CACHE_TIMEOUT = 300  # 5 minutes
+
     class Meta:
         db_table = 'achievements'
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.CACHE_KEY)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        cache.delete(self.CACHE_KEY)
+        return result
+
+    @classmethod
+    def catalogue(cls):
+        """All achievement definitions, cached for up to CACHE_TIMEOUT seconds."""
+        return cache.get_or_set(cls.CACHE_KEY, lambda: list(cls.objects.all()), cls.CACHE_TIMEOUT)
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -340,6 +397,13 @@ class Trade(models.Model):
     class Meta:
         db_table = 'trades'
         ordering = ['-executed_at']
+        indexes = [
+            models.Index(fields=['user', '-executed_at'], name='trades_user_executed_idx'),
+            models.Index(
+                fields=['user', 'trade_type', 'symbol', 'executed_at'],
+                name='trades_user_type_sym_time_idx',
+            ),
+        ]
 
     def to_dict(self):
         return {
@@ -389,6 +453,9 @@ class Watchlist(models.Model):
     class Meta:
         db_table = 'watchlist'
         unique_together = ['user', 'symbol']
+        indexes = [
+            models.Index(fields=['user', '-starred', '-added_at'], name='watchlist_user_order_idx'),
+        ]
 
 
 class PriceAlert(models.Model):
@@ -404,6 +471,9 @@ class PriceAlert(models.Model):
 
     class Meta:
         db_table = 'price_alerts'
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='alerts_user_created_idx'),
+        ]
 
     def to_dict(self):
         return {
@@ -432,6 +502,17 @@ class Friendship(models.Model):
     class Meta:
         db_table = 'friendships'
         unique_together = ['from_user', 'to_user']
+        indexes = [
+            models.Index(fields=['status', 'from_user'], name='friendships_status_from_idx'),
+            models.Index(fields=['status', 'to_user'], name='friendships_status_to_idx'),
+        ]
+        constraints = [
+            # One friendship per pair of users, whichever side sent the request
+            models.UniqueConstraint(
+                Least('from_user', 'to_user'), Greatest('from_user', 'to_user'),
+                name='friendships_unique_pair',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.from_user.username} -> {self.to_user.username} ({self.status})"
@@ -441,7 +522,7 @@ class Friendship(models.Model):
             'username': user.username,
             'name': user.name,
             'initials': user.initials,
-            'avatarUrl': f'/media/{user.avatar_url}' if user.avatar_url and not user.avatar_url.startswith(('http://', 'https://')) else (user.avatar_url or None),
+            'avatarUrl': user.avatar_public_url,
             'level': user.level,
             'rank': user.rank,
         }
@@ -477,6 +558,9 @@ class LimitOrder(models.Model):
     class Meta:
         db_table = 'limit_orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status', '-created_at'], name='limit_orders_user_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.trade_type} {self.shares} {self.symbol} @ {self.limit_price}"
@@ -534,7 +618,7 @@ class APIKey(models.Model):
     user = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='api_keys')
     name = models.CharField(max_length=100)
     key_prefix = models.CharField(max_length=8)
-    key_hash = models.CharField(max_length=128)
+    key_hash = models.CharField(max_length=128, db_index=True)
     is_active = models.BooleanField(default=True)
     last_used_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
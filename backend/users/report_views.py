@@ -3,15 +3,19 @@ Report generation views for paper trading app.
 Computes weekly, monthly, and yearly trading reports from actual trade data.
 """
 
+import math
 from datetime import date, timedelta
 from collections import defaultdict
 
+import numpy as np
+from django.db.models import FloatField, Subquery
+from django.db.models.functions import Cast
 from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from .models import Trade, UserProfile, UserSettings
-from .views import get_user, compute_trader_stats
+from .views import get_user, _portfolio_return_expr
 
 _CURRENCY_SYMBOLS = {
     'USD': '$', 'EUR': '€', 'GBP': '£', 'INR': '₹',
@@ -19,6 +23,10 @@ _CURRENCY_SYMBOLS = {
     'CNY': '¥', 'SGD': 'S$',
 }
 
+# Bar labels are fixed, so build them once rather than per report
+_WEEKDAY_LABELS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri')
+_WEEK_LABELS = ('W1', 'W2', 'W3', 'W4')
+
 _EXCHANGE_RATES = {
     'USD': 1.0, 'EUR': 0.92, 'GBP': 0.79, 'INR': 83.12,
     'JPY': 149.50, 'CAD': 1.36, 'AUD': 1.53, 'CHF': 0.88,
@@ -34,12 +42,6 @@ def _get_user_currency(user):
         return 'USD'
 
 
-def _get_currency_symbol(user):
-    """Return the currency symbol for a user based on their settings."""
-    currency = _get_user_currency(user)
-    return _CURRENCY_SYMBOLS.get(currency, currency)
-
-
 def _convert(value, from_currency, to_currency):
     """Convert a monetary value between currencies using exchange rates."""
     if from_currency == to_currency:
@@ -49,6 +51,19 @@ def _convert(value, from_currency, to_currency):
     return value * (to_rate / from_rate)
 
 
+def _float_trades(trades_qs):
+    """Annotate a Trade queryset with float copies of price/shares/total.
+
+    The cast happens in SQL, so the report loops and NumPy arrays read
+    `price_f`, `shares_f` and `total_f` without per-row Decimal conversion.
+    """
+    return trades_qs.annotate(
+        price_f=Cast('price', FloatField()),
+        shares_f=Cast('shares', FloatField()),
+        total_f=Cast('total', FloatField()),
+    )
+
+
 def _avg_buy_price(trades_qs, symbol, before_dt):
     """Compute average buy price for a symbol from BUY trades before a given datetime."""
     buys = trades_qs.filter(trade_type='BUY', symbol=symbol, executed_at__lte=before_dt)
@@ -59,26 +74,89 @@ def _avg_buy_price(trades_qs, symbol, before_dt):
     return total_cost / total_shares if total_shares > 0 else 0
 
 
+def _avg_buy_kernel(is_buy, symbol_id, ts, price, shares):
+    """Running average buy price for every row of a set of trades.
+
+    All arguments are parallel NumPy arrays.  The value at index i is the
+    share-weighted mean price of the BUY rows of symbol_id[i] executed at or
+    before ts[i] (0 if there are none).  Rows are ordered by (symbol, time,
+    buys first) so a single cumulative sum per column replaces the per-sell
+    average-buy-price queries.
+    """
+    order = np.lexsort((~is_buy, ts, symbol_id))
+    buy_cost = np.where(is_buy, price * shares, 0.0)[order]
+    buy_shares = np.where(is_buy, shares, 0.0)[order]
+    cum_cost = np.cumsum(buy_cost)
+    cum_shares = np.cumsum(buy_shares)
+
+    # Rebase the running totals at the first row of each symbol
+    sym = symbol_id[order]
+    starts = np.flatnonzero(np.r_[True, sym[1:] != sym[:-1]])
+    first = np.repeat(starts, np.diff(np.r_[starts, len(sym)]))
+    cost = cum_cost - (cum_cost - buy_cost)[first]
+    held = cum_shares - (cum_shares - buy_shares)[first]
+
+    avg = np.zeros(len(order))
+    avg[order] = np.divide(cost, held, out=np.zeros_like(cost), where=held > 0)
+    return avg
+
+
+def _sell_profits(all_user_trades, sells):
+    """Compute realized profit (in each trade's own currency) for a sequence of SELL trades.
+
+    BUY history for the sold symbols is fetched in a single query and run through
+    `_avg_buy_kernel` together with the sells.  Both querysets must come from
+    `_float_trades`.  Returns a float64 array aligned with `sells`.
+    """
+    sells = list(sells)
+    if not sells:
+        return np.zeros(0)
+
+    rows = list(
+        all_user_trades
+        .filter(trade_type='BUY', symbol__in={s.symbol for s in sells})
+        .values_list('symbol', 'executed_at', 'price_f', 'shares_f')
+    )
+    n_buys = len(rows)
+    rows += [(s.symbol, s.executed_at, s.price_f, s.shares_f) for s in sells]
+    n = len(rows)
+
+    _, symbol_id = np.unique([r[0] for r in rows], return_inverse=True)
+    ts = np.fromiter((r[1].timestamp() for r in rows), dtype=np.float64, count=n)
+    price = np.fromiter((r[2] for r in rows), dtype=np.float64, count=n)
+    shares = np.fromiter((r[3] for r in rows), dtype=np.float64, count=n)
+    is_buy = np.arange(n) < n_buys
+
+    avg = _avg_buy_kernel(is_buy, symbol_id, ts, price, shares)
+    return (price[n_buys:] - avg[n_buys:]) * shares[n_buys:]
+
+
 def _compute_sell_stats(all_user_trades, sells, to_currency='USD'):
     """Compute win/loss stats and per-symbol profit from a queryset of SELL trades.
 
-    Returns (winning_sells, total_sells, per_symbol_profit dict).
-    per_symbol_profit maps symbol -> total realized profit converted to to_currency.
+    Returns (winning_sells, total_sells, per_symbol_profit dict, shares_by_symbol dict,
+    sell_profits list).  per_symbol_profit maps symbol -> total realized profit
+    converted to to_currency; shares_by_symbol maps symbol -> total shares sold;
+    sell_profits holds each sell's converted profit, aligned with `sells`.
     """
-    winning = 0
-    total = 0
-    per_symbol = defaultdict(float)
+    sells = list(sells)
+    if not sells:
+        return 0, 0, {}, {}, []
+
+    profits = _sell_profits(all_user_trades, sells)
 
-    for sell in sells:
-        avg_bp = _avg_buy_price(all_user_trades, sell.symbol, sell.executed_at)
-        profit = (float(sell.price) - avg_bp) * float(sell.shares)
-        profit = _convert(profit, sell.currency, to_currency)
-        per_symbol[sell.symbol] += profit
-        total += 1
-        if float(sell.price) > avg_bp:
-            winning += 1
+    currencies, currency_id = np.unique([s.currency for s in sells], return_inverse=True)
+    rates = np.array([_convert(1.0, c, to_currency) for c in currencies])
+    converted = profits * rates[currency_id]
 
-    return winning, total, dict(per_symbol)
+    symbols, symbol_id = np.unique([s.symbol for s in sells], return_inverse=True)
+    symbols = symbols.tolist()
+    per_symbol = dict(zip(symbols, np.bincount(symbol_id, weights=converted).tolist()))
+    sold = np.fromiter((s.shares_f for s in sells), dtype=np.float64, count=len(sells))
+    shares_by_symbol = dict(zip(symbols, np.bincount(symbol_id, weights=sold).tolist()))
+
+    winning = int(np.count_nonzero(profits > 0))
+    return winning, len(sells), per_symbol, shares_by_symbol, converted.tolist()
 
 
 def _format_currency(value, sym='$'):
@@ -105,16 +183,14 @@ def _format_percent(value):
     return f"{sign}{value:.1f}%"
 
 
-def _consecutive_wins(all_user_trades, sells_ordered):
-    """Count consecutive winning sell trades from most recent."""
-    streak = 0
-    for sell in sells_ordered:
-        avg_bp = _avg_buy_price(all_user_trades, sell.symbol, sell.executed_at)
-        if float(sell.price) > avg_bp:
-            streak += 1
-        else:
-            break
-    return streak
+def _consecutive_wins(profits):
+    """Count consecutive winning sell trades from most recent.
+
+    `profits` is the array returned by `_sell_profits` for sells ordered by
+    executed_at descending.
+    """
+    losses = profits <= 0
+    return int(np.argmax(losses)) if losses.any() else len(profits)
 
 
 # ---------------------------------------------------------------------------
@@ -124,27 +200,27 @@ def _consecutive_wins(all_user_trades, sells_ordered):
 def compute_weekly_report(user):
     """Compute weekly report data for a user. Returns a dict (or None if no trades)."""
     now = timezone.now()
-    sym = _get_currency_symbol(user)
     display_currency = _get_user_currency(user)
+    sym = _CURRENCY_SYMBOLS.get(display_currency, display_currency)
     monday = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
 
-    all_user_trades = Trade.objects.filter(user=user)
+    all_user_trades = _float_trades(Trade.objects.filter(user=user))
     week_trades = all_user_trades.filter(executed_at__gte=monday)
 
     if not week_trades.exists():
         return None
 
     sells = week_trades.filter(trade_type='SELL').order_by('-executed_at')
-    winning, total_sells, per_symbol_profit = _compute_sell_stats(all_user_trades, sells, display_currency)
-    total_pl = sum(per_symbol_profit.values())
+    winning, total_sells, per_symbol_profit, shares_by_symbol, sell_profits = _compute_sell_stats(all_user_trades, sells, display_currency)
+    total_pl = math.fsum(per_symbol_profit.values())
 
     # Previous week for comparison
     prev_monday = monday - timedelta(days=7)
     prev_sells = all_user_trades.filter(
         trade_type='SELL', executed_at__gte=prev_monday, executed_at__lt=monday
     )
-    _, _, prev_per_symbol = _compute_sell_stats(all_user_trades, prev_sells, display_currency)
-    prev_pl = sum(prev_per_symbol.values())
+    _, _, prev_per_symbol, _, _ = _compute_sell_stats(all_user_trades, prev_sells, display_currency)
+    prev_pl = math.fsum(prev_per_symbol.values())
     if prev_pl != 0:
         return_change = ((total_pl - prev_pl) / abs(prev_pl)) * 100
         return_change_str = f"{_format_percent(return_change)} from last week"
@@ -164,7 +240,7 @@ def compute_weekly_report(user):
         trade_cur = best_trade.currency if best_trade else 'USD'
         avg_bp = _avg_buy_price(all_user_trades, best_sym, now)
         avg_bp_display = _convert(avg_bp, trade_cur, display_currency)
-        sell_shares = sum(float(s.shares) for s in sells.filter(symbol=best_sym))
+        sell_shares = shares_by_symbol[best_sym]
         best_pct = (best_profit / (avg_bp_display * sell_shares)) * 100 if avg_bp_display > 0 and sell_shares > 0 else 0
     else:
         best_sym = best_name = "N/A"
@@ -172,8 +248,8 @@ def compute_weekly_report(user):
         best_pct = 0
 
     # Volume (convert each trade's total to display currency)
-    volume = sum(
-        _convert(float(t.total), t.currency, display_currency)
+    volume = math.fsum(
+        _convert(t.total_f, t.currency, display_currency)
         for t in week_trades
     )
 
@@ -191,38 +267,32 @@ def compute_weekly_report(user):
 
     # Daily bars (group by weekday)
     daily_pl = defaultdict(float)
-    day_labels = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    for sell in sells:
-        avg_bp = _avg_buy_price(all_user_trades, sell.symbol, sell.executed_at)
-        pl = (float(sell.price) - avg_bp) * float(sell.shares)
-        pl = _convert(pl, sell.currency, display_currency)
+    for sell, pl in zip(sells, sell_profits):
         weekday = sell.executed_at.weekday()
         daily_pl[weekday] += pl
 
-    bars = []
-    for i, label in enumerate(day_labels[:5]):  # Mon-Fri
-        bars.append({'label': label, 'value': round(daily_pl.get(i, 0), 2), 'highlight': False})
+    bars = [
+        {'label': label, 'value': round(daily_pl.get(i, 0), 2), 'highlight': False}
+        for i, label in enumerate(_WEEKDAY_LABELS)  # Mon-Fri
+    ]
     if bars and any(b['value'] != 0 for b in bars):
         max_idx = max(range(len(bars)), key=lambda x: abs(bars[x]['value']))
         bars[max_idx]['highlight'] = True
 
-    daily_change = sum(daily_pl.values())
+    daily_change = math.fsum(daily_pl.values())
     daily_change_pct = _format_percent((daily_change / volume * 100) if volume > 0 else 0)
 
     # Date range
     sunday = monday + timedelta(days=6)
     date_range = f"{monday.strftime('%b %d').upper()} - {sunday.strftime('%b %d, %Y').upper()}"
 
-    # User leaderboard position
-    all_users = UserProfile.objects.all()
-    entries = []
-    for u in all_users:
-        stats = compute_trader_stats(u)
-        if stats['totalTrades'] == 0:
-            continue
-        entries.append((u.id, stats['portfolioReturn']))
-    entries.sort(key=lambda x: x[1], reverse=True)
-    position = next((i + 1 for i, (uid, _) in enumerate(entries) if uid == user.id), len(entries) or 1)
+    # User leaderboard position: one COUNT of the traders ranked above them
+    traders = UserProfile.objects.filter(total_trades__gt=0).annotate(pr=_portfolio_return_expr())
+    if user.total_trades > 0:
+        own_return = traders.filter(pk=user.pk).values('pr')
+        position = traders.filter(pr__gt=Subquery(own_return)).count() + 1
+    else:
+        position = traders.count() or 1
 
     return {
         'dateRange': date_range,
@@ -252,22 +322,22 @@ def compute_weekly_report(user):
 def compute_monthly_report(user, year, month):
     """Compute monthly report data for a user. Returns a dict (or None if no trades)."""
     now = timezone.now()
-    sym = _get_currency_symbol(user)
     display_currency = _get_user_currency(user)
+    sym = _CURRENCY_SYMBOLS.get(display_currency, display_currency)
 
-    all_user_trades = Trade.objects.filter(user=user)
+    all_user_trades = _float_trades(Trade.objects.filter(user=user))
     month_trades = all_user_trades.filter(executed_at__year=year, executed_at__month=month)
 
     if not month_trades.exists():
         return None
 
     sells = month_trades.filter(trade_type='SELL').order_by('-executed_at')
-    winning, total_sells, per_symbol_profit = _compute_sell_stats(all_user_trades, sells, display_currency)
-    total_pl = sum(per_symbol_profit.values())
+    winning, total_sells, per_symbol_profit, shares_by_symbol, sell_profits = _compute_sell_stats(all_user_trades, sells, display_currency)
+    total_pl = math.fsum(per_symbol_profit.values())
 
     unique_symbols = set(month_trades.values_list('symbol', flat=True))
-    volume = sum(
-        _convert(float(t.total), t.currency, display_currency)
+    volume = math.fsum(
+        _convert(t.total_f, t.currency, display_currency)
         for t in month_trades
     )
 
@@ -280,7 +350,7 @@ def compute_monthly_report(user, year, month):
         trade_cur = best_trade.currency if best_trade else 'USD'
         avg_bp = _avg_buy_price(all_user_trades, best_sym, now)
         avg_bp_display = _convert(avg_bp, trade_cur, display_currency)
-        sell_shares = sum(float(s.shares) for s in sells.filter(symbol=best_sym))
+        sell_shares = shares_by_symbol[best_sym]
         best_pct = (best_profit / (avg_bp_display * sell_shares)) * 100 if avg_bp_display > 0 and sell_shares > 0 else 0
     else:
         best_sym = best_name = "N/A"
@@ -308,17 +378,15 @@ def compute_monthly_report(user, year, month):
 
     # Week bars (group trades into 4 weeks)
     week_pls = defaultdict(float)
-    for sell in sells:
-        avg_bp = _avg_buy_price(all_user_trades, sell.symbol, sell.executed_at)
-        pl = (float(sell.price) - avg_bp) * float(sell.shares)
-        pl = _convert(pl, sell.currency, display_currency)
+    for sell, pl in zip(sells, sell_profits):
         day_of_month = sell.executed_at.day
         week_num = min((day_of_month - 1) // 7, 3)  # 0-3
         week_pls[week_num] += pl
 
-    week_bars = []
-    for i in range(4):
-        week_bars.append({'label': f"W{i + 1}", 'value': round(week_pls.get(i, 0), 2), 'highlight': False})
+    week_bars = [
+        {'label': label, 'value': round(week_pls.get(i, 0), 2), 'highlight': False}
+        for i, label in enumerate(_WEEK_LABELS)
+    ]
     if week_bars and any(b['value'] != 0 for b in week_bars):
         max_idx = max(range(len(week_bars)), key=lambda x: abs(week_bars[x]['value']))
         week_bars[max_idx]['highlight'] = True
@@ -351,22 +419,22 @@ def compute_monthly_report(user, year, month):
 def compute_yearly_report(user, year):
     """Compute yearly report data for a user. Returns a dict (or None if no trades)."""
     now = timezone.now()
-    sym = _get_currency_symbol(user)
     display_currency = _get_user_currency(user)
+    sym = _CURRENCY_SYMBOLS.get(display_currency, display_currency)
 
-    all_user_trades = Trade.objects.filter(user=user)
+    all_user_trades = _float_trades(Trade.objects.filter(user=user))
     year_trades = all_user_trades.filter(executed_at__year=year)
 
     if not year_trades.exists():
         return None
 
     sells = year_trades.filter(trade_type='SELL').order_by('-executed_at')
-    winning, total_sells, per_symbol_profit = _compute_sell_stats(all_user_trades, sells, display_currency)
-    total_profit = sum(per_symbol_profit.values())
+    winning, total_sells, per_symbol_profit, shares_by_symbol, sell_profits = _compute_sell_stats(all_user_trades, sells, display_currency)
+    total_profit = math.fsum(per_symbol_profit.values())
 
     unique_symbols = set(year_trades.values_list('symbol', flat=True))
-    volume = sum(
-        _convert(float(t.total), t.currency, display_currency)
+    volume = math.fsum(
+        _convert(t.total_f, t.currency, display_currency)
         for t in year_trades
     )
     win_rate = round((winning / total_sells * 100)) if total_sells > 0 else 0
@@ -380,7 +448,7 @@ def compute_yearly_report(user, year):
         trade_cur = best_trade.currency if best_trade else 'USD'
         avg_bp = _avg_buy_price(all_user_trades, best_sym, now)
         avg_bp_display = _convert(avg_bp, trade_cur, display_currency)
-        sell_shares = sum(float(s.shares) for s in sells.filter(symbol=best_sym))
+        sell_shares = shares_by_symbol[best_sym]
         best_return_pct = (best_profit_val / (avg_bp_display * sell_shares)) * 100 if avg_bp_display > 0 and sell_shares > 0 else 0
     else:
         best_sym = "N/A"
@@ -404,10 +472,7 @@ def compute_yearly_report(user, year):
 
     # Best day: calendar date with highest single-day profit
     daily_profits = defaultdict(float)
-    for sell in sells:
-        avg_bp = _avg_buy_price(all_user_trades, sell.symbol, sell.executed_at)
-        pl = (float(sell.price) - avg_bp) * float(sell.shares)
-        pl = _convert(pl, sell.currency, display_currency)
+    for sell, pl in zip(sells, sell_profits):
         daily_profits[sell.executed_at.date()] += pl
 
     if daily_profits:
@@ -422,12 +487,12 @@ def compute_yearly_report(user, year):
     user_count = 0
     users_below = 0
     for u in all_users:
-        u_sells = Trade.objects.filter(user=u, trade_type='SELL', executed_at__year=year)
+        u_all_trades = _float_trades(Trade.objects.filter(user=u))
+        u_sells = u_all_trades.filter(trade_type='SELL', executed_at__year=year)
         if not u_sells.exists():
             continue
-        u_all_trades = Trade.objects.filter(user=u)
-        _, _, u_per_symbol = _compute_sell_stats(u_all_trades, u_sells, 'USD')
-        u_profit = sum(u_per_symbol.values())
+        _, _, u_per_symbol, _, _ = _compute_sell_stats(u_all_trades, u_sells, 'USD')
+        u_profit = math.fsum(u_per_symbol.values())
         user_count += 1
         if u_profit < total_profit_usd:
             users_below += 1
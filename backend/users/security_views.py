@@ -3,13 +3,21 @@ Security views for password, 2FA, and API key management.
 """
 
 import hashlib
+import hmac
+import os
 import secrets
 import base64
+import binascii
+import struct
+import time
 from datetime import timedelta
-from io import BytesIO
 
 import pyotp
 import qrcode
+from qrcode.image.svg import SvgPathFillImage
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -19,7 +27,31 @@ from rest_framework import status
 
 from .models import UserProfile, APIKey
 from .views import get_user
-from .email_service import generate_verification_token, send_password_reset_email
+from .email_service import generate_password_reset_token, send_password_reset_email
+
+
+def verify_totp(secret, code, valid_window=1):
+    """Check a 6-digit TOTP code (RFC 6238: HMAC-SHA1, 30s step) for a base32 secret.
+
+    Accepts codes from up to `valid_window` steps either side of the current one.
+    Every candidate is compared with hmac.compare_digest so timing does not
+    reveal which step (if any) matched.
+    """
+    if len(code) != 6 or not code.isascii() or not code.isdigit():
+        return False
+    try:
+        key = base64.b32decode(secret.upper() + '=' * (-len(secret) % 8))
+    except (binascii.Error, ValueError):
+        return False
+
+    counter = int(time.time()) // 30
+    matched = False
+    for step in range(counter - valid_window, counter + valid_window + 1):
+        mac = hmac.new(key, struct.pack('>Q', step), hashlib.sha1).digest()
+        offset = mac[-1] & 0x0F
+        value = (int.from_bytes(mac[offset:offset + 4], 'big') & 0x7FFFFFFF) % 1000000
+        matched |= hmac.compare_digest(code, f'{value:06d}')
+    return matched
 
 
 class ChangePasswordView(APIView):
@@ -70,6 +102,8 @@ class ForgotPasswordView(APIView):
     authentication_classes = []
     permission_classes = []
 
+    RESET_EMAIL_COOLDOWN = 60  # seconds
+
     def post(self, request):
         email = request.data.get('email', '').strip().lower()
 
@@ -82,27 +116,36 @@ class ForgotPasswordView(APIView):
         # Always return a generic message to avoid email enumeration
         generic_msg = 'If an account exists with this email, a password reset link has been sent.'
 
+        # Rate limit: one reset request per email per cooldown window. cache.add()
+        # only succeeds when the key is absent, so throttled requests never touch
+        # the database (and the check applies to unknown emails too).
+        if not cache.add(f'pwreset:{email}', 1, timeout=self.RESET_EMAIL_COOLDOWN):
+            return Response(
+                {'error': f'Please wait {self.RESET_EMAIL_COOLDOWN} seconds before requesting another reset email.'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
         try:
             user = UserProfile.objects.get(email=email)
         except UserProfile.DoesNotExist:
             return Response({'message': generic_msg})
 
-        # Rate limit: don't resend if last email was sent less than 60 seconds ago
-        if user.password_reset_sent_at:
-            elapsed = (timezone.now() - user.password_reset_sent_at).total_seconds()
-            if elapsed < 60:
-                return Response(
-                    {'error': f'Please wait {int(60 - elapsed)} seconds before requesting another reset email.'},
-                    status=status.HTTP_429_TOO_MANY_REQUESTS
-                )
-
         from .models import SiteSettings
-        settings = SiteSettings.load()
-
-        token = generate_verification_token()
+        settings = SiteSettings.load_cached()
+
+        # The cache check above is only a fast path. Claim the cooldown on the row
+        # itself so concurrent requests can't both send; a request that loses
+        # gets the generic message, as an unknown email would.
+        token = generate_password_reset_token()
+        now = timezone.now()
+        claimed = UserProfile.objects.filter(pk=user.pk).filter(
+            Q(password_reset_sent_at__isnull=True)
+            | Q(password_reset_sent_at__lte=now - timedelta(seconds=self.RESET_EMAIL_COOLDOWN))
+        ).update(password_reset_token=token, password_reset_sent_at=now)
+        if not claimed:
+            return Response({'message': generic_msg})
         user.password_reset_token = token
-        user.password_reset_sent_at = timezone.now()
-        user.save(update_fields=['password_reset_token', 'password_reset_sent_at'])
+        user.password_reset_sent_at = now
 
         reset_url = f'{settings.frontend_url}/reset-password?token={token}'
         success, error = send_password_reset_email(user, reset_url)
@@ -140,31 +183,33 @@ class ResetPasswordView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Expired tokens are filtered out by the lookup itself; stale tokens
+        # are cleared in bulk by the clear_expired_reset_tokens command.
+        cutoff = timezone.now() - self.RESET_TOKEN_EXPIRY
         try:
-            user = UserProfile.objects.get(password_reset_token=token)
+            user = UserProfile.objects.get(
+                password_reset_token=token,
+                password_reset_sent_at__gte=cutoff,
+            )
         except UserProfile.DoesNotExist:
             return Response(
                 {'error': 'Invalid or expired reset token'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check token expiry (1 hour)
-        if user.password_reset_sent_at:
-            age = timezone.now() - user.password_reset_sent_at
-            if age > self.RESET_TOKEN_EXPIRY:
-                # Clear expired token
-                user.password_reset_token = ''
-                user.save(update_fields=['password_reset_token'])
-                return Response(
-                    {'error': 'Reset token has expired. Please request a new one.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-        # Set new password and clear token
+        # Set new password and clear token in a single UPDATE. Matching on the
+        # token as well means a token consumed concurrently cannot be reused.
         user.set_password(new_password)
-        user.password_reset_token = ''
-        user.password_changed_at = timezone.now()
-        user.save(update_fields=['password', 'password_reset_token', 'password_changed_at'])
+        updated = UserProfile.objects.filter(pk=user.pk, password_reset_token=token).update(
+            password=user.password,
+            password_reset_token='',
+            password_changed_at=timezone.now(),
+        )
+        if not updated:
+            return Response(
+                {'error': 'Invalid or expired reset token'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         return Response({'message': 'Password reset successfully. You can now log in.'})
 
@@ -193,15 +238,13 @@ class TwoFactorSetupView(APIView):
             issuer_name='Open Papertrade'
         )
 
-        # Generate QR code as base64 PNG
-        qr = qrcode.make(provisioning_uri)
-        buffer = BytesIO()
-        qr.save(buffer, format='PNG')
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        # Generate QR code as a base64 SVG (vector path, no raster/PNG encoding)
+        qr = qrcode.make(provisioning_uri, image_factory=SvgPathFillImage)
+        qr_base64 = base64.b64encode(qr.to_string()).decode('utf-8')
 
         return Response({
             'secret': secret,
-            'qrCode': f'data:image/png;base64,{qr_base64}',
+            'qrCode': f'data:image/svg+xml;base64,{qr_base64}',
             'provisioningUri': provisioning_uri,
         })
 
@@ -225,17 +268,17 @@ class TwoFactorVerifyView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        totp = pyotp.TOTP(user.totp_secret)
-        if not totp.verify(code, valid_window=1):
+        if not verify_totp(user.totp_secret, code):
             return Response(
                 {'error': 'Invalid verification code'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Generate 10 backup codes
-        plain_codes = [secrets.token_hex(4) for _ in range(10)]
+        # Generate 10 backup codes (8 hex chars each) from a single entropy read
+        raw = os.urandom(40)
+        plain_codes = [raw[i:i + 4].hex() for i in range(0, 40, 4)]
         hashed_codes = [
-            hashlib.sha256(c.encode()).hexdigest() for c in plain_codes
+            hashlib.sha256(c.encode('ascii')).digest().hex() for c in plain_codes
         ]
 
         user.is_2fa_enabled = True
@@ -267,10 +310,11 @@ class TwoFactorDisableView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        user.totp_secret = ''
-        user.is_2fa_enabled = False
-        user.backup_codes = []
-        user.save(update_fields=['totp_secret', 'is_2fa_enabled', 'backup_codes'])
+        UserProfile.objects.filter(pk=user.pk).update(
+            totp_secret='',
+            is_2fa_enabled=False,
+            backup_codes=[],
+        )
 
         return Response({'success': True})
 
@@ -295,25 +339,29 @@ class APIKeyListCreateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Limit to 10 active keys
-        active_count = user.api_keys.filter(is_active=True).count()
-        if active_count >= 10:
-            return Response(
-                {'error': 'Maximum of 10 active API keys allowed'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
         # Generate key: opt_ + 40 hex chars
         raw_key = f'opt_{secrets.token_hex(20)}'
         key_prefix = raw_key[:8]
-        key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
+        key_hash = hashlib.sha256(raw_key.encode()).digest().hex()
 
-        api_key = APIKey.objects.create(
-            user=user,
-            name=name,
-            key_prefix=key_prefix,
-            key_hash=key_hash,
-        )
+        # Lock the user row so concurrent requests can't both pass the limit check
+        with transaction.atomic():
+            UserProfile.objects.select_for_update().get(pk=user.pk)
+
+            # Limit to 10 active keys
+            active_count = user.api_keys.filter(is_active=True).count()
+            if active_count >= 10:
+                return Response(
+                    {'error': 'Maximum of 10 active API keys allowed'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            api_key = APIKey.objects.create(
+                user=user,
+                name=name,
+                key_prefix=key_prefix,
+                key_hash=key_hash,
+            )
 
         result = api_key.to_dict()
         result['fullKey'] = raw_key
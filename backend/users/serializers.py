@@ -0,0 +1,58 @@
+"""
+Serializers for validating user trading request payloads.
+"""
+
+from rest_framework import serializers
+
+
+class PositiveDecimalField(serializers.DecimalField):
+    """Decimal input that must be greater than zero.
+
+    Precision is left unbounded here; the model fields quantize on save, so
+    quote prices with extra decimal places are accepted as before.
+    """
+    default_error_messages = {
+        'not_positive': 'Ensure this value is greater than 0.',
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__(max_digits=None, decimal_places=None, **kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if value <= 0:
+            self.fail('not_positive')
+        return value
+
+
+class _OrderSerializer(serializers.Serializer):
+    """Fields shared by market trades and limit orders."""
+    symbol = serializers.CharField(max_length=20)
+    name = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    type = serializers.CharField()
+    shares = PositiveDecimalField()
+    currency = serializers.CharField(max_length=3, required=False, default='USD')
+
+    def validate_symbol(self, value):
+        return value.upper()
+
+    def validate_type(self, value):
+        value = value.upper()
+        if value not in ('BUY', 'SELL'):
+            raise serializers.ValidationError('Must be BUY or SELL.')
+        return value
+
+
+class ExecuteTradeSerializer(_OrderSerializer):
+    """Serializer for market trade requests."""
+    price = PositiveDecimalField()
+
+
+class LimitOrderSerializer(_OrderSerializer):
+    """Serializer for new limit order requests."""
+    limitPrice = PositiveDecimalField()
+
+
+class FillLimitOrderSerializer(serializers.Serializer):
+    """Serializer for limit order fill requests."""
+    currentPrice = PositiveDecimalField()
@@ -8,12 +8,16 @@ DEBUG=False: Supabase Storage bucket
 import os
 import uuid
 import logging
+import tempfile
+import threading
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 _supabase_client = None
 
+_MEDIA_PREFIX = '/media/'
+
 
 def _get_supabase_client():
     """Lazy-initialize Supabase client singleton."""
@@ -49,12 +53,23 @@ def upload_avatar(file):
     # Production: upload to Supabase Storage
     client = _get_supabase_client()
     storage_path = f'avatars/{filename}'
-    file_bytes = file.read()
-    client.storage.from_(settings.SUPABASE_STORAGE_BUCKET).upload(
-        storage_path,
-        file_bytes,
-        file_options={'content-type': file.content_type},
-    )
+    file_options = {'content-type': file.content_type}
+
+    # Hand the client a file path so it streams from disk instead of holding the
+    # whole upload in memory. Large uploads are already on disk; small in-memory
+    # ones are spooled out chunk by chunk.
+    if hasattr(file, 'temporary_file_path'):
+        client.storage.from_(settings.SUPABASE_STORAGE_BUCKET).upload(
+            storage_path, file.temporary_file_path(), file_options=file_options,
+        )
+    else:
+        with tempfile.NamedTemporaryFile(suffix=f'.{ext}') as tmp:
+            for chunk in file.chunks():
+                tmp.write(chunk)
+            tmp.flush()
+            client.storage.from_(settings.SUPABASE_STORAGE_BUCKET).upload(
+                storage_path, tmp.name, file_options=file_options,
+            )
     public_url = client.storage.from_(settings.SUPABASE_STORAGE_BUCKET).get_public_url(storage_path)
     return public_url
 
@@ -80,13 +95,29 @@ def delete_avatar(avatar_url):
     try:
         client = _get_supabase_client()
         marker = f'/storage/v1/object/public/{settings.SUPABASE_STORAGE_BUCKET}/'
-        if marker in avatar_url:
-            storage_path = avatar_url.split(marker, 1)[1]
+        _, sep, storage_path = avatar_url.partition(marker)
+        if sep:
             client.storage.from_(settings.SUPABASE_STORAGE_BUCKET).remove([storage_path])
     except Exception as e:
         logger.warning('Failed to delete avatar from Supabase Storage: %s', e)
 
 
+def delete_avatar_in_background(avatar_url):
+    """
+    Delete a replaced avatar without blocking the caller.
+
+    Local files are removed inline (cheap); Supabase deletions are a network
+    round-trip, so they run on a daemon thread. Failures are logged by
+    delete_avatar and never reach the request.
+    """
+    if not avatar_url:
+        return
+    if settings.DEBUG:
+        delete_avatar(avatar_url)
+        return
+    threading.Thread(target=delete_avatar, args=(avatar_url,), daemon=True).start()
+
+
 def get_avatar_url(avatar_url):
     """
     Convert stored avatar value to a frontend-usable URL.
@@ -101,4 +132,4 @@ def get_avatar_url(avatar_url):
         return ''
     if avatar_url.startswith('http'):
         return avatar_url
-    return f'/media/{avatar_url}'
+    return f'{_MEDIA_PREFIX}{avatar_url}'
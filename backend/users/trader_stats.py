@@ -0,0 +1,89 @@
+"""
+Denormalized trader stats on UserProfile (total_trades, total_sells,
+winning_sells, realized_profit).
+
+Every code path that creates a Trade calls record_trade() in the same
+transaction; bulk inserts (seeding) call rebuild_trader_stats() afterwards.
+A sell is priced against the average cost of all BUYs of that symbol executed
+up to it, matching how the leaderboard has always computed realized profit.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Sum, F, Case, When, Value, Window, DecimalField
+
+from .models import UserProfile, Trade
+
+PROFIT_QUANTUM = Decimal('0.0001')  # matches UserProfile.realized_profit decimal_places
+
+
+def record_trade(trade):
+    """Fold a newly created trade into its user's stats columns."""
+    deltas = {'total_trades': 1}
+
+    if trade.trade_type == 'SELL':
+        deltas['total_sells'] = 1
+        buys = Trade.objects.filter(
+            user_id=trade.user_id, symbol=trade.symbol, trade_type='BUY',
+            executed_at__lte=trade.executed_at,
+        ).aggregate(cost=Sum(F('price') * F('shares')), shares=Sum('shares'))
+        if buys['shares']:
+            avg_buy_price = buys['cost'] / buys['shares']
+            deltas['realized_profit'] = ((trade.price - avg_buy_price) * trade.shares).quantize(PROFIT_QUANTUM)
+            if trade.price > avg_buy_price:
+                deltas['winning_sells'] = 1
+
+    UserProfile.objects.filter(pk=trade.user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+    # Mirror the increments on the in-memory user so callers (e.g. XP awards)
+    # can read the new counters without reloading.
+    if Trade.user.is_cached(trade):
+        user = trade.user
+        for field, delta in deltas.items():
+            setattr(user, field, getattr(user, field) + delta)
+
+
+def _buy_only(expr):
+    """`expr` for BUY trades, 0 otherwise (for summing over mixed trade rows)."""
+    return Case(When(trade_type='BUY', then=expr), default=Value(0), output_field=DecimalField())
+
+
+def rebuild_trader_stats(user_ids):
+    """Recompute the stats columns for the given users from their full trade history."""
+    stats = {uid: [0, 0, 0, Decimal('0')] for uid in user_ids}  # trades, sells, winning sells, realized
+
+    # Running BUY cost/shares per (user, symbol) up to each trade's executed_at.
+    # The default window frame (RANGE ... CURRENT ROW) includes peers, so buys
+    # at the same timestamp as a sell count towards it. Buys stay in the result
+    # set: filtering on trade_type would run before the window is evaluated.
+    running = {
+        'partition_by': [F('user_id'), F('symbol')],
+        'order_by': F('executed_at').asc(),
+    }
+    rows = Trade.objects.filter(user_id__in=user_ids).annotate(
+        buy_cost=Window(Sum(_buy_only(F('price') * F('shares'))), **running),
+        buy_shares=Window(Sum(_buy_only(F('shares'))), **running),
+    ).values_list('user_id', 'trade_type', 'price', 'shares', 'buy_cost', 'buy_shares')
+
+    for user_id, trade_type, price, shares, buy_cost, buy_shares in rows:
+        entry = stats[user_id]
+        entry[0] += 1
+        if trade_type != 'SELL':
+            continue
+        entry[1] += 1
+        if buy_shares and buy_shares > 0:
+            avg_buy_price = Decimal(buy_cost) / Decimal(buy_shares)
+            # Rounded per sell, exactly as record_trade() adds it
+            entry[3] += ((price - avg_buy_price) * shares).quantize(PROFIT_QUANTUM)
+            if price > avg_buy_price:
+                entry[2] += 1
+
+    for user_id, (total_trades, total_sells, winning_sells, realized_profit) in stats.items():
+        UserProfile.objects.filter(pk=user_id).update(
+            total_trades=total_trades,
+            total_sells=total_sells,
+            winning_sells=winning_sells,
+            realized_profit=realized_profit,
+        )
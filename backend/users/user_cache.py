@@ -0,0 +1,52 @@
+"""
+Short-lived per-user cache for dashboard reads (stats, achievements, holdings)
+and the invested amount behind the trader stats on leaderboards and profiles.
+
+Entries expire after USER_CACHE_TIMEOUT seconds and are dropped once a write
+that changes the underlying data (trades, fills, resets, transfers) commits.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+USER_CACHE_TIMEOUT = 30  # seconds
+USER_CACHE_KINDS = ('stats', 'ach', 'holdings', 'invested')
+
+
+def user_cache_key(kind, user_id):
+    return f'{kind}:{user_id}'
+
+
+def cached_for_user(kind, user_id, compute):
+    """Return the cached `kind` payload for a user, computing and storing it on a miss."""
+    key = user_cache_key(kind, user_id)
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, USER_CACHE_TIMEOUT)
+    return data
+
+
+def cached_many_for_users(kind, user_ids, compute_missing):
+    """
+    Bulk variant of cached_for_user. Fetches all keys in one round-trip and calls
+    compute_missing(missing_ids) -> {user_id: payload} only for the misses.
+    """
+    keys = {user_cache_key(kind, user_id): user_id for user_id in user_ids}
+    found = cache.get_many(keys)
+    data = {keys[key]: value for key, value in found.items()}
+    missing = [user_id for key, user_id in keys.items() if key not in found]
+    if missing:
+        computed = compute_missing(missing)
+        cache.set_many(
+            {user_cache_key(kind, user_id): value for user_id, value in computed.items()},
+            USER_CACHE_TIMEOUT,
+        )
+        data.update(computed)
+    return data
+
+
+def invalidate_user_cache(*user_ids):
+    """Drop the cached dashboard payloads for the given users after the current transaction commits."""
+    keys = [user_cache_key(kind, user_id) for user_id in user_ids for kind in USER_CACHE_KINDS]
+    transaction.on_commit(lambda: cache.delete_many(keys))
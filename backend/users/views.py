@@ -2,10 +2,16 @@
 User API views for paper trading app.
 """
 
+from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Count, F
-from django.db import transaction
+from django.db.models import (
+    Sum, Count, F, Case, When, Value, OuterRef, Subquery, ExpressionWrapper, DecimalField, FloatField, Window,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
 from django.conf import settings as django_settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -15,13 +21,17 @@ from decimal import Decimal
 
 from .models import (
     UserProfile, UserSettings, Achievement, UserAchievement,
-    Trade, Holding, Watchlist, PriceAlert, LimitOrder, Friendship, Transfer
+    Trade, Holding, Watchlist, PriceAlert, LimitOrder, Friendship, Transfer, CopyTrade,
+    USERNAME_RE,
 )
 from django.db.models import Q
 from .market_hours import is_market_open, is_symbol_valid_for_market
-from .storage import upload_avatar, delete_avatar
+from .storage import upload_avatar, delete_avatar, delete_avatar_in_background
 from .achievement_service import check_achievements
 from .xp_service import award_trade_xp, award_achievement_xp, get_rank_info
+from .trader_stats import record_trade
+from .user_cache import cached_for_user, cached_many_for_users, invalidate_user_cache
+from .serializers import ExecuteTradeSerializer, LimitOrderSerializer, FillLimitOrderSerializer
 from stocks.services import CurrencyExchangeService
 
 
@@ -30,8 +40,13 @@ from rest_framework.exceptions import NotAuthenticated
 
 def get_user(request):
     """Get user from DRF auth (cookie JWT) or Authorization header. Raises 401 if not authenticated."""
+    # Already resolved earlier in this request
+    if (cached := getattr(request, '_cached_user', None)) is not None:
+        return cached
+
     # Try DRF-authenticated user first (set by CookieJWTAuthentication)
     if hasattr(request, 'user') and isinstance(request.user, UserProfile):
+        request._cached_user = request.user
         return request.user
 
     # Fall back to Authorization header (manual parse for non-DRF paths)
@@ -42,44 +57,61 @@ def get_user(request):
             token = AccessToken(auth_header.split(' ')[1])
             user_id = token.get('user_id')
             if user_id:
-                return get_object_or_404(UserProfile, id=user_id)
+                user = get_object_or_404(UserProfile.objects.select_related('settings'), id=user_id)
+                request._cached_user = user
+                return user
         except Exception:
             pass
 
     raise NotAuthenticated('Authentication required')
 
 
+def get_user_settings(user):
+    """Return the user's settings row, creating it on first use.
+
+    Users from get_user() already have settings joined in, so the common case
+    costs no query.
+    """
+    try:
+        return user.settings
+    except UserSettings.DoesNotExist:
+        settings, _ = UserSettings.objects.get_or_create(user=user)
+        user.settings = settings
+        return settings
+
+
 class UserProfileView(APIView):
     """Get and update user profile."""
 
     def get(self, request):
         user = get_user(request)
 
-        # Ensure settings exist
-        if not hasattr(user, 'settings'):
-            UserSettings.objects.create(user=user)
-
         return Response({
             'profile': user.to_dict(),
-            'settings': user.settings.to_dict(),
+            'settings': get_user_settings(user).to_dict(),
         })
 
     def patch(self, request):
-        import re
         user = get_user(request)
         data = request.data
 
-        # Update allowed fields
+        # Update allowed fields. Only those are written back: a full save() would
+        # also overwrite counters (buying power, trader stats) that concurrent
+        # trades update with F() expressions.
+        changed = ['updated_at']
         if 'name' in data:
             user.name = data['name']
+            changed.append('name')
         if 'email' in data:
             user.email = data['email']
+            changed.append('email')
         if 'avatarUrl' in data:
             user.avatar_url = data['avatarUrl']
+            changed.append('avatar_url')
         if 'username' in data:
             new_username = data['username'].strip().lower()
             if new_username != user.username:
-                if not re.match(r'^[a-z0-9](?:[a-z0-9-]{1,28}[a-z0-9])?$', new_username):
+                if not USERNAME_RE.match(new_username):
                     return Response(
                         {'error': 'Username must be 3-30 characters, lowercase letters, numbers, and hyphens. Cannot start or end with a hyphen.'},
                         status=status.HTTP_400_BAD_REQUEST
@@ -90,8 +122,9 @@ class UserProfileView(APIView):
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 user.username = new_username
+                changed.append('username')
 
-        user.save()
+        user.save(update_fields=changed)
         return Response(user.to_dict())
 
 
@@ -124,13 +157,12 @@ class AvatarUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Delete old avatar if it exists
-        delete_avatar(user.avatar_url)
-
-        # Upload new avatar
+        # Upload new avatar, then clean up the old one off the request path
+        old_avatar = user.avatar_url
         avatar_value = upload_avatar(file)
         user.avatar_url = avatar_value
         user.save(update_fields=['avatar_url'])
+        delete_avatar_in_background(old_avatar)
 
         if avatar_value.startswith('http'):
             avatar_url = avatar_value
@@ -158,19 +190,13 @@ class UserSettingsView(APIView):
     def get(self, request):
         user = get_user(request)
 
-        if not hasattr(user, 'settings'):
-            UserSettings.objects.create(user=user)
-
-        return Response(user.settings.to_dict())
+        return Response(get_user_settings(user).to_dict())
 
     def patch(self, request):
         user = get_user(request)
         data = request.data
 
-        if not hasattr(user, 'settings'):
-            settings = UserSettings.objects.create(user=user)
-        else:
-            settings = user.settings
+        settings = get_user_settings(user)
 
         # Update notification settings
         if 'notifications' in data:
@@ -215,48 +241,53 @@ class UserStatsView(APIView):
 
     def get(self, request):
         user = get_user(request)
+        return Response(cached_for_user('stats', user.id, lambda: self._compute_stats(user)))
 
-        # Calculate stats
-        trades = Trade.objects.filter(user=user)
-        holdings = Holding.objects.filter(user=user)
-
-        total_trades = trades.count()
-
-        # Calculate total invested (cost basis of current holdings)
-        total_invested = sum(
-            float(h.shares) * float(h.avg_cost) for h in holdings
+    def _compute_stats(self, user):
+        # Total invested (cost basis of current holdings), multiplied in the DB
+        holdings_agg = Holding.objects.filter(user=user).aggregate(
+            invested=Sum(F('shares') * F('avg_cost')),
+            count=Count('id'),
         )
+        total_invested = float(holdings_agg['invested'] or 0)
 
-        # Win rate: compare each SELL's price against the avg_cost of the BUY trades for that symbol
-        sell_trades = trades.filter(trade_type='SELL')
+        # Win rate: compare each SELL's price against the avg price of the BUY trades
+        # for that symbol up to that sell. One ordered pass keeps running buy totals
+        # per symbol; BUY sorts before SELL so same-timestamp buys are included.
+        rows = Trade.objects.filter(user=user).order_by(
+            'symbol', 'executed_at', 'trade_type'
+        ).values_list('symbol', 'trade_type', 'price', 'shares')
+
+        total_trades = 0
+        total_sells = 0
         winning_sells = 0
-        for sell in sell_trades:
-            # Find the average buy price for this symbol from buy trades before this sell
-            buy_trades_for_symbol = trades.filter(
-                trade_type='BUY',
-                symbol=sell.symbol,
-                executed_at__lte=sell.executed_at,
-            )
-            if buy_trades_for_symbol.exists():
-                total_buy_cost = sum(float(t.price) * float(t.shares) for t in buy_trades_for_symbol)
-                total_buy_shares = sum(float(t.shares) for t in buy_trades_for_symbol)
-                avg_buy_price = total_buy_cost / total_buy_shares if total_buy_shares > 0 else 0
-                if float(sell.price) > avg_buy_price:
+        current_symbol = None
+        buy_cost = buy_shares = 0.0
+        for symbol, trade_type, price, shares in rows:
+            total_trades += 1
+            if symbol != current_symbol:
+                current_symbol = symbol
+                buy_cost = buy_shares = 0.0
+            if trade_type == 'BUY':
+                buy_cost += float(price) * float(shares)
+                buy_shares += float(shares)
+            else:
+                total_sells += 1
+                if buy_shares > 0 and float(price) > buy_cost / buy_shares:
                     winning_sells += 1
 
-        total_sells = sell_trades.count()
         win_rate = (winning_sells / total_sells * 100) if total_sells > 0 else 0
 
-        return Response({
+        return {
             'totalTrades': total_trades,
             'totalInvested': round(total_invested, 2),
             'buyingPower': float(user.buying_power),
             'initialBalance': float(user.initial_balance),
-            'holdingsCount': holdings.count(),
+            'holdingsCount': holdings_agg['count'],
             'winRate': round(win_rate, 1),
             'memberSince': user.created_at.isoformat(),
             'rank': get_rank_info(user),
-        })
+        }
 
 
 class AchievementsView(APIView):
@@ -264,28 +295,29 @@ class AchievementsView(APIView):
 
     def get(self, request):
         user = get_user(request)
+        return Response(cached_for_user('ach', user.id, lambda: self._compute_achievements(user)))
 
+    def _compute_achievements(self, user):
         # Get all achievements and user's unlocked ones
-        all_achievements = Achievement.objects.all()
-        user_achievements = UserAchievement.objects.filter(user=user).select_related('achievement')
-        unlocked_ids = set(ua.achievement_id for ua in user_achievements)
+        all_achievements = Achievement.catalogue()
+        unlocked_map = dict(
+            UserAchievement.objects.filter(user=user).values_list('achievement_id', 'unlocked_at')
+        )
 
         achievements = []
         for ach in all_achievements:
+            unlocked_at = unlocked_map.get(ach.id)
             achievements.append({
                 **ach.to_dict(),
-                'unlocked': ach.id in unlocked_ids,
-                'unlockedAt': next(
-                    (ua.unlocked_at.isoformat() for ua in user_achievements if ua.achievement_id == ach.id),
-                    None
-                )
+                'unlocked': ach.id in unlocked_map,
+                'unlockedAt': unlocked_at.isoformat() if unlocked_at else None,
             })
 
-        return Response({
+        return {
             'achievements': achievements,
-            'unlockedCount': len(unlocked_ids),
+            'unlockedCount': len(unlocked_map),
             'totalCount': len(all_achievements),
-        })
+        }
 
 
 class HoldingsView(APIView):
@@ -293,158 +325,231 @@ class HoldingsView(APIView):
 
     def get(self, request):
         user = get_user(request)
-        holdings = Holding.objects.filter(user=user)
-        return Response([h.to_dict() for h in holdings])
+        return Response(cached_for_user('holdings', user.id, lambda: self._compute_holdings(user)))
+
+    def _compute_holdings(self, user):
+        # Read-only payload: build the Holding.to_dict() shape from plain rows
+        # instead of hydrating model instances
+        rows = Holding.objects.filter(user=user).values_list(
+            'symbol', 'name', 'shares', 'avg_cost', 'currency'
+        )
+        return [
+            {
+                'symbol': symbol,
+                'name': name,
+                'shares': float(shares),
+                'avgCost': float(avg_cost),
+                'currency': currency,
+            }
+            for symbol, name, shares, avg_cost, currency in rows
+        ]
 
 
 class TradesView(APIView):
     """Get user trade history."""
 
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+
     def get(self, request):
         user = get_user(request)
-        limit = int(request.query_params.get('limit', 50))
-        trades = Trade.objects.filter(user=user)[:limit]
-        return Response([t.to_dict() for t in trades])
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        limit = max(1, min(limit, self.MAX_LIMIT))
 
+        trades = Trade.objects.filter(user=user).order_by('-executed_at', '-id')
 
-class ExecuteTradeView(APIView):
-    """Execute a buy or sell trade."""
+        # Keyset pagination: ?before=<trade id> returns trades older than that one
+        before = request.query_params.get('before')
+        if before:
+            try:
+                cursor = Trade.objects.filter(user=user, id=before).values('executed_at', 'id').first()
+            except ValidationError:
+                cursor = None
+            if cursor is None:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            trades = trades.filter(
+                Q(executed_at__lt=cursor['executed_at'])
+                | Q(executed_at=cursor['executed_at'], id__lt=cursor['id'])
+            )
 
-    @transaction.atomic
-    def post(self, request):
-        user = get_user(request)
-        data = request.data
+        return Response([t.to_dict() for t in trades[:limit]])
 
-        symbol = data.get('symbol', '').upper()
-        name = data.get('name', symbol)
-        trade_type = data.get('type', '').upper()
-        shares = Decimal(str(data.get('shares', 0)))
-        price = Decimal(str(data.get('price', 0)))
-        currency = data.get('currency', 'USD')
 
-        if not symbol or trade_type not in ['BUY', 'SELL'] or shares <= 0 or price <= 0:
-            return Response(
-                {'error': 'Invalid trade parameters'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+def _adjust_buying_power(user, delta):
+    """
+    Add `delta` to the user's buying power with a single atomic UPDATE and mirror
+    it on the in-memory instance. Avoids a full-row save() on the trade paths.
+    """
+    UserProfile.objects.filter(pk=user.pk).update(buying_power=F('buying_power') + delta)
+    user.buying_power += delta
 
-        # Enforce market hours (crypto is exempt)
-        user_market = user.settings.market if hasattr(user, 'settings') else 'US'
-        market_status = is_market_open(user_market, symbol)
-        if not market_status['is_open']:
-            return Response(
-                {'error': market_status['reason'], 'marketClosed': True},
-                status=status.HTTP_400_BAD_REQUEST
-            )
 
-        # Validate symbol belongs to user's market (BUY only — allow SELL to liquidate cross-market holdings)
-        if trade_type == 'BUY':
-            valid, market_error = is_symbol_valid_for_market(symbol, user_market)
-            if not valid:
-                return Response(
-                    {'error': market_error},
-                    status=status.HTTP_400_BAD_REQUEST
+def _add_to_holding(user, symbol, name, shares, price, currency):
+    """
+    Add a bought lot to the user's holding of `symbol`, recomputing the average
+    cost under a row lock. The first buy of a symbol inserts inside a savepoint;
+    if a concurrent first buy won the (user, symbol) insert, lock its row and
+    take the update path instead.
+    """
+    holding = Holding.objects.select_for_update().filter(user=user, symbol=symbol).first()
+    if holding is None:
+        try:
+            with transaction.atomic():
+                Holding.objects.create(
+                    user=user, symbol=symbol, name=name,
+                    shares=shares, avg_cost=price, currency=currency,
                 )
+            return
+        except IntegrityError:
+            holding = Holding.objects.select_for_update().get(user=user, symbol=symbol)
+
+    new_value = holding.shares * holding.avg_cost + shares * price
+    new_shares = holding.shares + shares
+    Holding.objects.filter(pk=holding.pk).update(
+        shares=new_shares, avg_cost=new_value / new_shares,
+    )
+
+
+def _debit_buying_power(user, amount):
+    """
+    Subtract `amount` from the user's buying power only if the stored balance
+    still covers it. Returns False (and leaves both copies untouched) otherwise,
+    so concurrent debits can't drive the balance negative.
+    """
+    debited = UserProfile.objects.filter(pk=user.pk, buying_power__gte=amount).update(
+        buying_power=F('buying_power') - amount,
+    )
+    if debited:
+        user.buying_power -= amount
+    return bool(debited)
 
-        total = shares * price
 
-        if trade_type == 'BUY':
-            # Check buying power
-            if total > user.buying_power:
+def _award_trade_progress(user, trade_type, sell_price=None, avg_buy_price=None):
+    """
+    Check achievements and award XP for a committed trade, then refresh the user.
+    Kept out of the trade transaction so the holding/balance row locks are
+    released before this bookkeeping runs. Returns newly unlocked achievements.
+    """
+    with transaction.atomic():
+        new_achievements = check_achievements(user)
+        award_trade_xp(user, trade_type, sell_price=sell_price, avg_buy_price=avg_buy_price)
+        award_achievement_xp(user, new_achievements)
+    invalidate_user_cache(user.id)
+
+    # Refresh user from DB to get updated XP
+    user.refresh_from_db()
+    return new_achievements
+
+
+class ExecuteTradeView(APIView):
+    """Execute a buy or sell trade."""
+
+    def post(self, request):
+        user = get_user(request)
+        serializer = ExecuteTradeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Invalid trade parameters', 'details': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        data = serializer.validated_data
+
+        with transaction.atomic():
+            symbol = data['symbol']
+            name = data.get('name', symbol)
+            trade_type = data['type']
+            shares = data['shares']
+            price = data['price']
+            currency = data['currency']
+
+            # Enforce market hours (crypto is exempt)
+            user_market = user.settings.market if hasattr(user, 'settings') else 'US'
+            market_status = is_market_open(user_market, symbol)
+            if not market_status['is_open']:
                 return Response(
-                    {'error': 'Insufficient buying power'},
+                    {'error': market_status['reason'], 'marketClosed': True},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Deduct from buying power
-            user.buying_power -= total
-            user.save()
+            # Validate symbol belongs to user's market (BUY only — allow SELL to liquidate cross-market holdings)
+            if trade_type == 'BUY':
+                valid, market_error = is_symbol_valid_for_market(symbol, user_market)
+                if not valid:
+                    return Response(
+                        {'error': market_error},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
 
-            # Update or create holding
-            holding, created = Holding.objects.get_or_create(
-                user=user,
-                symbol=symbol,
-                defaults={'name': name, 'shares': 0, 'avg_cost': 0, 'currency': currency}
-            )
+            total = shares * price
+            avg_buy_price = None
 
-            if not created:
-                # Calculate new average cost
-                current_value = holding.shares * holding.avg_cost
-                new_value = current_value + total
-                new_shares = holding.shares + shares
-                holding.avg_cost = new_value / new_shares
-                holding.shares = new_shares
-            else:
-                holding.shares = shares
-                holding.avg_cost = price
-                holding.name = name
+            if trade_type == 'BUY':
+                # Check and deduct buying power in one conditional UPDATE
+                if not _debit_buying_power(user, total):
+                    return Response(
+                        {'error': 'Insufficient buying power'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
 
-            holding.save()
+                # Update or create holding
+                _add_to_holding(user, symbol, name, shares, price, currency)
 
-        else:  # SELL
-            # Check if user has enough shares
-            try:
-                holding = Holding.objects.get(user=user, symbol=symbol)
-            except Holding.DoesNotExist:
-                return Response(
-                    {'error': f'No holdings for {symbol}'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            else:  # SELL
+                # Check if user has enough shares; lock the row so concurrent
+                # sells can't both sell the same shares
+                try:
+                    holding = Holding.objects.select_for_update().get(user=user, symbol=symbol)
+                except Holding.DoesNotExist:
+                    return Response(
+                        {'error': f'No holdings for {symbol}'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
 
-            if shares > holding.shares:
-                return Response(
-                    {'error': 'Insufficient shares'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+                if shares > holding.shares:
+                    return Response(
+                        {'error': 'Insufficient shares'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
 
-            # Add to buying power
-            user.buying_power += total
-            user.save()
+                # Cost basis of the position being sold, used for the XP win check
+                avg_buy_price = float(holding.avg_cost)
 
-            # Update holding
-            holding.shares -= shares
-            if holding.shares == 0:
-                holding.delete()
-            else:
-                holding.save()
+                # Add to buying power
+                _adjust_buying_power(user, total)
 
-        # Create trade record
-        trade = Trade.objects.create(
-            user=user,
-            symbol=symbol,
-            name=name,
-            trade_type=trade_type,
-            shares=shares,
-            price=price,
-            total=total,
-            currency=currency,
-        )
+                # Update holding
+                holding.shares -= shares
+                if holding.shares == 0:
+                    holding.delete()
+                else:
+                    holding.save()
 
-        # Dispatch copy trades to followers
-        try:
-            from .copy_trading_service import dispatch_copy_trades
-            dispatch_copy_trades(trade)
-        except Exception:
-            pass  # Don't let copy trading errors block the original trade
+            # Create trade record
+            trade = Trade.objects.create(
+                user=user,
+                symbol=symbol,
+                name=name,
+                trade_type=trade_type,
+                shares=shares,
+                price=price,
+                total=total,
+                currency=currency,
+            )
+            record_trade(trade)
 
-        # Check for newly unlocked achievements
-        new_achievements = check_achievements(user)
+            # Dispatch copy trades to followers
+            try:
+                from .copy_trading_service import dispatch_copy_trades
+                dispatch_copy_trades(trade)
+            except Exception:
+                pass  # Don't let copy trading errors block the original trade
 
-        # Award XP
+        # Achievements and XP run after the trade has committed
         sell_price = float(price) if trade_type == 'SELL' else None
-        avg_buy_price = None
-        if trade_type == 'SELL':
-            # Get avg buy price from buy trades for this symbol
-            buy_trades = Trade.objects.filter(user=user, symbol=symbol, trade_type='BUY')
-            if buy_trades.exists():
-                total_cost = sum(float(t.price) * float(t.shares) for t in buy_trades)
-                total_shares = sum(float(t.shares) for t in buy_trades)
-                avg_buy_price = total_cost / total_shares if total_shares > 0 else 0
-        award_trade_xp(user, trade_type, sell_price=sell_price, avg_buy_price=avg_buy_price)
-        award_achievement_xp(user, new_achievements)
-
-        # Refresh user from DB to get updated XP
-        user.refresh_from_db()
+        new_achievements = _award_trade_progress(user, trade_type, sell_price, avg_buy_price)
 
         response_data = {
             'trade': trade.to_dict(),
@@ -491,6 +596,8 @@ class WatchlistView(APIView):
 
         # Check for newly unlocked achievements
         new_achievements = check_achievements(user)
+        if new_achievements:
+            invalidate_user_cache(user.id)
 
         response_data = {
             'symbol': item.symbol,
@@ -519,14 +626,12 @@ class WatchlistStarView(APIView):
 
     def post(self, request, symbol):
         user = get_user(request)
+        item = Watchlist.objects.filter(user=user, symbol=symbol.upper())
 
-        try:
-            item = Watchlist.objects.get(user=user, symbol=symbol.upper())
-            item.starred = not item.starred
-            item.save()
-            return Response({'starred': item.starred})
-        except Watchlist.DoesNotExist:
+        # Flip the flag in SQL rather than load-modify-save the whole row
+        if not item.update(starred=~F('starred')):
             return Response({'error': 'Not in watchlist'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'starred': item.values_list('starred', flat=True).get()})
 
 
 class PriceAlertsView(APIView):
@@ -581,8 +686,15 @@ class ResetAccountView(APIView):
                     status=status.HTTP_429_TOO_MANY_REQUESTS
                 )
 
-        # Delete all trades, holdings, watchlist, alerts, limit orders
-        Trade.objects.filter(user=user).delete()
+        # Delete all trades, holdings, watchlist, alerts, limit orders.
+        # Trades are referenced by CopyTrade (SET_NULL), which forces Django's
+        # delete collector to load every trade row; clear those references in
+        # bulk and issue a single DELETE instead. The other models have no
+        # dependents, so .delete() already takes the single-DELETE fast path.
+        CopyTrade.objects.filter(source_trade__user=user).update(source_trade=None)
+        CopyTrade.objects.filter(executed_trade__user=user).update(executed_trade=None)
+        trades = Trade.objects.filter(user=user)
+        trades._raw_delete(trades.db)
         Holding.objects.filter(user=user).delete()
         Watchlist.objects.filter(user=user).delete()
         PriceAlert.objects.filter(user=user).delete()
@@ -595,7 +707,18 @@ class ResetAccountView(APIView):
         user.rank = 'Retail Trader'
         user.level = 1
         user.last_reset_at = timezone.now()
-        user.save()
+        UserProfile.objects.filter(pk=user.pk).update(
+            buying_power=user.buying_power,
+            xp=0,
+            rank='Retail Trader',
+            level=1,
+            last_reset_at=user.last_reset_at,
+            total_trades=0,
+            total_sells=0,
+            winning_sells=0,
+            realized_profit=0,
+        )
+        invalidate_user_cache(user.id)
 
         return Response({
             'success': True,
@@ -615,32 +738,31 @@ class LimitOrdersView(APIView):
     @transaction.atomic
     def post(self, request):
         user = get_user(request)
-        data = request.data
-
-        symbol = data.get('symbol', '').upper()
-        name = data.get('name', symbol)
-        trade_type = data.get('type', '').upper()
-        shares = Decimal(str(data.get('shares', 0)))
-        limit_price = Decimal(str(data.get('limitPrice', 0)))
-        currency = data.get('currency', 'USD')
-
-        if not symbol or trade_type not in ['BUY', 'SELL'] or shares <= 0 or limit_price <= 0:
+        serializer = LimitOrderSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response(
-                {'error': 'Invalid order parameters'},
+                {'error': 'Invalid order parameters', 'details': serializer.errors},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        data = serializer.validated_data
+
+        symbol = data['symbol']
+        name = data.get('name', symbol)
+        trade_type = data['type']
+        shares = data['shares']
+        limit_price = data['limitPrice']
+        currency = data['currency']
 
         total = shares * limit_price
 
         if trade_type == 'BUY':
-            if total > user.buying_power:
+            # Reserve buying power, re-checking the stored balance in the UPDATE
+            if not _debit_buying_power(user, total):
                 return Response(
                     {'error': 'Insufficient buying power'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            # Reserve buying power
-            user.buying_power -= total
-            user.save()
+            invalidate_user_cache(user.id)
         else:
             # Validate user has enough shares
             try:
@@ -689,8 +811,8 @@ class CancelLimitOrderView(APIView):
 
         # Refund buying power for BUY orders
         if order.trade_type == 'BUY':
-            user.buying_power += order.shares * order.limit_price
-            user.save()
+            _adjust_buying_power(user, order.shares * order.limit_price)
+            invalidate_user_cache(user.id)
 
         order.status = 'CANCELLED'
         order.save()
@@ -704,130 +826,105 @@ class CancelLimitOrderView(APIView):
 class FillLimitOrderView(APIView):
     """Fill a limit order when price condition is met."""
 
-    @transaction.atomic
     def post(self, request, order_id):
         user = get_user(request)
-        current_price = Decimal(str(request.data.get('currentPrice', 0)))
-
-        if current_price <= 0:
+        serializer = FillLimitOrderSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response(
-                {'error': 'Invalid current price'},
+                {'error': 'Invalid current price', 'details': serializer.errors},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        current_price = serializer.validated_data['currentPrice']
 
-        try:
-            order = LimitOrder.objects.get(id=order_id, user=user, status='PENDING')
-        except LimitOrder.DoesNotExist:
-            return Response(
-                {'error': 'Order not found or not pending'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        # Re-validate price condition
-        if order.trade_type == 'BUY' and current_price > order.limit_price:
-            return Response(
-                {'error': 'Price condition not met for BUY'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        if order.trade_type == 'SELL' and current_price < order.limit_price:
-            return Response(
-                {'error': 'Price condition not met for SELL'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        total = order.shares * current_price
-
-        if order.trade_type == 'BUY':
-            # Buying power was already reserved; create/update holding
-            holding, created = Holding.objects.get_or_create(
-                user=user,
-                symbol=order.symbol,
-                defaults={'name': order.name, 'shares': 0, 'avg_cost': 0, 'currency': order.currency}
-            )
-
-            if not created:
-                current_value = holding.shares * holding.avg_cost
-                new_value = current_value + (order.shares * current_price)
-                new_shares = holding.shares + order.shares
-                holding.avg_cost = new_value / new_shares
-                holding.shares = new_shares
-            else:
-                holding.shares = order.shares
-                holding.avg_cost = current_price
-                holding.name = order.name
-
-            holding.save()
-
-            # Refund the difference if filled at a better price than reserved
-            reserved = order.shares * order.limit_price
-            actual = order.shares * current_price
-            if actual < reserved:
-                user.buying_power += (reserved - actual)
-                user.save()
-        else:
-            # SELL: re-validate shares still exist
+        with transaction.atomic():
             try:
-                holding = Holding.objects.get(user=user, symbol=order.symbol)
-            except Holding.DoesNotExist:
-                order.status = 'CANCELLED'
-                order.save()
+                order = LimitOrder.objects.get(id=order_id, user=user, status='PENDING')
+            except LimitOrder.DoesNotExist:
                 return Response(
-                    {'error': f'No holdings for {order.symbol}'},
-                    status=status.HTTP_400_BAD_REQUEST
+                    {'error': 'Order not found or not pending'},
+                    status=status.HTTP_404_NOT_FOUND
                 )
 
-            if order.shares > holding.shares:
-                order.status = 'CANCELLED'
-                order.save()
+            # Re-validate price condition
+            if order.trade_type == 'BUY' and current_price > order.limit_price:
                 return Response(
-                    {'error': 'Insufficient shares'},
+                    {'error': 'Price condition not met for BUY'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if order.trade_type == 'SELL' and current_price < order.limit_price:
+                return Response(
+                    {'error': 'Price condition not met for SELL'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Credit buying power
-            user.buying_power += total
-            user.save()
+            total = order.shares * current_price
+            avg_buy_price = None
 
-            # Update holding
-            holding.shares -= order.shares
-            if holding.shares == 0:
-                holding.delete()
+            if order.trade_type == 'BUY':
+                # Buying power was already reserved; create/update holding
+                _add_to_holding(
+                    user, order.symbol, order.name, order.shares, current_price, order.currency,
+                )
+
+                # Refund the difference if filled at a better price than reserved
+                reserved = order.shares * order.limit_price
+                actual = order.shares * current_price
+                if actual < reserved:
+                    _adjust_buying_power(user, reserved - actual)
             else:
-                holding.save()
+                # SELL: re-validate shares still exist, holding the row lock
+                try:
+                    holding = Holding.objects.select_for_update().get(user=user, symbol=order.symbol)
+                except Holding.DoesNotExist:
+                    order.status = 'CANCELLED'
+                    order.save()
+                    return Response(
+                        {'error': f'No holdings for {order.symbol}'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
 
-        # Create trade record
-        trade = Trade.objects.create(
-            user=user,
-            symbol=order.symbol,
-            name=order.name,
-            trade_type=order.trade_type,
-            shares=order.shares,
-            price=current_price,
-            total=total,
-            currency=order.currency,
-        )
+                if order.shares > holding.shares:
+                    order.status = 'CANCELLED'
+                    order.save()
+                    return Response(
+                        {'error': 'Insufficient shares'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
 
-        # Mark order as filled
-        order.status = 'FILLED'
-        order.filled_at = timezone.now()
-        order.save()
+                # Cost basis of the position being sold, used for the XP win check
+                avg_buy_price = float(holding.avg_cost)
 
-        # Check for newly unlocked achievements
-        new_achievements = check_achievements(user)
+                # Credit buying power
+                _adjust_buying_power(user, total)
 
-        # Award XP
-        sell_price = float(current_price) if order.trade_type == 'SELL' else None
-        avg_buy_price = None
-        if order.trade_type == 'SELL':
-            buy_trades = Trade.objects.filter(user=user, symbol=order.symbol, trade_type='BUY')
-            if buy_trades.exists():
-                total_cost = sum(float(t.price) * float(t.shares) for t in buy_trades)
-                total_shares = sum(float(t.shares) for t in buy_trades)
-                avg_buy_price = total_cost / total_shares if total_shares > 0 else 0
-        award_trade_xp(user, order.trade_type, sell_price=sell_price, avg_buy_price=avg_buy_price)
-        award_achievement_xp(user, new_achievements)
+                # Update holding
+                holding.shares -= order.shares
+                if holding.shares == 0:
+                    holding.delete()
+                else:
+                    holding.save()
+
+            # Create trade record
+            trade = Trade.objects.create(
+                user=user,
+                symbol=order.symbol,
+                name=order.name,
+                trade_type=order.trade_type,
+                shares=order.shares,
+                price=current_price,
+                total=total,
+                currency=order.currency,
+            )
+            record_trade(trade)
 
-        user.refresh_from_db()
+            # Mark order as filled
+            order.status = 'FILLED'
+            order.filled_at = timezone.now()
+            order.save()
+
+        # Achievements and XP run after the fill has committed
+        sell_price = float(current_price) if order.trade_type == 'SELL' else None
+        new_achievements = _award_trade_progress(user, order.trade_type, sell_price, avg_buy_price)
 
         response_data = {
             'trade': trade.to_dict(),
@@ -846,7 +943,6 @@ class FillLimitOrderView(APIView):
 class TransferFundsView(APIView):
     """Transfer virtual funds to a friend with real-time currency conversion."""
 
-    @transaction.atomic
     def post(self, request):
         user = get_user(request)
         to_username = request.data.get('to_username', '').strip()
@@ -869,7 +965,7 @@ class TransferFundsView(APIView):
 
         # Find recipient
         try:
-            recipient = UserProfile.objects.get(username=to_username)
+            recipient = UserProfile.objects.select_related('settings').get(username=to_username)
         except UserProfile.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -900,30 +996,41 @@ class TransferFundsView(APIView):
         except Exception:
             return Response({'error': 'Currency conversion failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Deduct from sender in sender's currency
-        user.buying_power -= amount
-        user.save()
-
-        # Add to recipient in recipient's currency
-        recipient.buying_power += recipient_amount
-        recipient.save()
-
         # Store USD equivalent for record-keeping
         try:
             usd_amount = CurrencyExchangeService.convert(amount, sender_currency, 'USD')
         except Exception:
             usd_amount = amount  # fallback
 
-        # Record transfer
-        transfer = Transfer.objects.create(
-            from_user=user,
-            to_user=recipient,
-            amount=usd_amount,
-            display_amount=amount,
-            currency=sender_currency,
-            recipient_currency=recipient_currency,
-            recipient_display_amount=recipient_amount,
-        )
+        # Conversions (which may hit the network) are done before any row is locked
+        with transaction.atomic():
+            # Lock both balances in a fixed order so opposite transfers can't deadlock,
+            # then re-check the sender's balance under the lock.
+            balances = dict(
+                UserProfile.objects.select_for_update()
+                .filter(id__in=[user.id, recipient.id])
+                .order_by('id')
+                .values_list('id', 'buying_power')
+            )
+            if amount > balances[user.id]:
+                return Response({'error': 'Insufficient buying power'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Deduct from sender in sender's currency, add to recipient in theirs
+            UserProfile.objects.filter(pk=user.pk).update(buying_power=F('buying_power') - amount)
+            UserProfile.objects.filter(pk=recipient.pk).update(buying_power=F('buying_power') + recipient_amount)
+            user.buying_power = balances[user.id] - amount
+            invalidate_user_cache(user.id, recipient.id)
+
+            # Record transfer
+            transfer = Transfer.objects.create(
+                from_user=user,
+                to_user=recipient,
+                amount=usd_amount,
+                display_amount=amount,
+                currency=sender_currency,
+                recipient_currency=recipient_currency,
+                recipient_display_amount=recipient_amount,
+            )
 
         return Response({
             'success': True,
@@ -937,8 +1044,12 @@ class TransferHistoryView(APIView):
 
     def get(self, request):
         user = get_user(request)
+        # to_dict() reads both usernames: join them in rather than loading each user per row
         transfers = Transfer.objects.filter(
             Q(from_user=user) | Q(to_user=user)
+        ).select_related('from_user', 'to_user').only(
+            'id', 'amount', 'display_amount', 'currency', 'recipient_currency',
+            'recipient_display_amount', 'created_at', 'from_user__username', 'to_user__username',
         ).order_by('-created_at')[:50]
         return Response([t.to_dict() for t in transfers])
 
@@ -974,17 +1085,16 @@ class ExchangeRatesView(APIView):
 class UpdateThemeView(APIView):
     """Update user's theme preference."""
 
+    VALID_THEMES = frozenset({'DARK', 'LIGHT', 'AUTO'})
+
     def post(self, request):
         user = get_user(request)
         theme = request.data.get('theme', 'DARK').upper()
 
-        if theme not in ['DARK', 'LIGHT', 'AUTO']:
+        if theme not in self.VALID_THEMES:
             return Response({'error': 'Invalid theme'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not hasattr(user, 'settings'):
-            settings = UserSettings.objects.create(user=user)
-        else:
-            settings = user.settings
+        settings = get_user_settings(user)
 
         settings.theme = theme
         settings.save()
@@ -1011,14 +1121,17 @@ class UpdateMarketView(APIView):
         },
     }
 
+    INVALID_MARKET_ERROR = f'Invalid market. Valid options: {", ".join(MARKETS)}'
+
+    # Static payload, built once
+    MARKETS_RESPONSE = {
+        'markets': [{'code': code, **info} for code, info in MARKETS.items()],
+    }
+
+    @method_decorator(cache_control(public=True, max_age=3600))
     def get(self, request):
         """Get available markets."""
-        return Response({
-            'markets': [
-                {'code': code, **info}
-                for code, info in self.MARKETS.items()
-            ]
-        })
+        return Response(self.MARKETS_RESPONSE)
 
     def post(self, request):
         """Update user's market preference."""
@@ -1027,14 +1140,11 @@ class UpdateMarketView(APIView):
 
         if market not in self.MARKETS:
             return Response(
-                {'error': f'Invalid market. Valid options: {", ".join(self.MARKETS.keys())}'},
+                {'error': self.INVALID_MARKET_ERROR},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not hasattr(user, 'settings'):
-            settings = UserSettings.objects.create(user=user)
-        else:
-            settings = user.settings
+        settings = get_user_settings(user)
 
         settings.market = market
         settings.save()
@@ -1046,6 +1156,18 @@ class UpdateMarketView(APIView):
         })
 
 
+def _currencies_payload(names, symbols, rates):
+    """Response body for UpdateCurrencyView.get (built once, at class creation)."""
+    return {
+        'currencies': [
+            {'code': code, 'name': name, 'symbol': symbols.get(code, code), 'rate': rates.get(code, 1.0)}
+            for code, name in names.items()
+        ],
+        'exchangeRates': rates,
+        'symbols': symbols,
+    }
+
+
 class UpdateCurrencyView(APIView):
     """Update user's preferred trading currency."""
 
@@ -1076,44 +1198,42 @@ class UpdateCurrencyView(APIView):
         'SGD': 'S$',
     }
 
+    CURRENCY_NAMES = {
+        'USD': 'US Dollar',
+        'EUR': 'Euro',
+        'GBP': 'British Pound',
+        'INR': 'Indian Rupee',
+        'JPY': 'Japanese Yen',
+        'CAD': 'Canadian Dollar',
+        'AUD': 'Australian Dollar',
+        'CHF': 'Swiss Franc',
+        'CNY': 'Chinese Yuan',
+        'SGD': 'Singapore Dollar',
+    }
+
+    VALID_CURRENCIES = frozenset(EXCHANGE_RATES)
+    INVALID_CURRENCY_ERROR = f'Invalid currency. Valid options: {", ".join(EXCHANGE_RATES)}'
+
+    # Static payload, built once
+    CURRENCIES_RESPONSE = _currencies_payload(CURRENCY_NAMES, CURRENCY_SYMBOLS, EXCHANGE_RATES)
+
+    @method_decorator(cache_control(public=True, max_age=3600))
     def get(self, request):
         """Get available currencies and exchange rates."""
-        return Response({
-            'currencies': [
-                {'code': code, 'name': name, 'symbol': self.CURRENCY_SYMBOLS.get(code, code), 'rate': self.EXCHANGE_RATES.get(code, 1.0)}
-                for code, name in [
-                    ('USD', 'US Dollar'),
-                    ('EUR', 'Euro'),
-                    ('GBP', 'British Pound'),
-                    ('INR', 'Indian Rupee'),
-                    ('JPY', 'Japanese Yen'),
-                    ('CAD', 'Canadian Dollar'),
-                    ('AUD', 'Australian Dollar'),
-                    ('CHF', 'Swiss Franc'),
-                    ('CNY', 'Chinese Yuan'),
-                    ('SGD', 'Singapore Dollar'),
-                ]
-            ],
-            'exchangeRates': self.EXCHANGE_RATES,
-            'symbols': self.CURRENCY_SYMBOLS,
-        })
+        return Response(self.CURRENCIES_RESPONSE)
 
     def post(self, request):
         """Update user's currency preference."""
         user = get_user(request)
         currency = request.data.get('currency', 'USD').upper()
 
-        valid_currencies = list(self.EXCHANGE_RATES.keys())
-        if currency not in valid_currencies:
+        if currency not in self.VALID_CURRENCIES:
             return Response(
-                {'error': f'Invalid currency. Valid options: {", ".join(valid_currencies)}'},
+                {'error': self.INVALID_CURRENCY_ERROR},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not hasattr(user, 'settings'):
-            settings = UserSettings.objects.create(user=user)
-        else:
-            settings = user.settings
+        settings = get_user_settings(user)
 
         settings.currency = currency
         settings.save()
@@ -1128,53 +1248,128 @@ class UpdateCurrencyView(APIView):
 
 def compute_trader_stats(user):
     """Compute trading stats for a user. Returns dict with portfolioReturn, realizedProfit, totalTrades, winRate."""
-    trades = Trade.objects.filter(user=user)
-    holdings = Holding.objects.filter(user=user)
-    total_trades = trades.count()
-
-    total_invested = sum(float(h.shares) * float(h.avg_cost) for h in holdings)
-
-    # Realized profit from sells
-    realized_profit = 0
-    sell_trades = trades.filter(trade_type='SELL')
-    winning_sells = 0
-    total_sells = sell_trades.count()
-
-    for sell in sell_trades:
-        buy_trades_for_symbol = trades.filter(
-            trade_type='BUY', symbol=sell.symbol,
-            executed_at__lte=sell.executed_at,
-        )
-        if buy_trades_for_symbol.exists():
-            total_buy_cost = sum(float(t.price) * float(t.shares) for t in buy_trades_for_symbol)
-            total_buy_shares = sum(float(t.shares) for t in buy_trades_for_symbol)
-            avg_buy_price = total_buy_cost / total_buy_shares if total_buy_shares > 0 else 0
-            realized_profit += (float(sell.price) - avg_buy_price) * float(sell.shares)
-            if float(sell.price) > avg_buy_price:
-                winning_sells += 1
+    return compute_trader_stats_bulk([user])[user.id]
+
+
+def compute_trader_stats_bulk(users):
+    """
+    Compute trader stats for many users at once. Returns {user_id: stats dict}.
+
+    Trade counts and realized profit come from the denormalized columns kept by
+    trader_stats.record_trade; only the invested amount needs a query, and it is
+    cached per user (see user_cache) and fetched for all misses in one aggregate.
+    """
+    invested_by_user = cached_many_for_users('invested', [u.id for u in users], _invested_by_user)
+    return {u.id: _trader_stats(u, invested_by_user[u.id]) for u in users}
+
+
+def _invested_by_user(user_ids):
+    """Cost basis of each user's open holdings, {user_id: float} (0 for none)."""
+    invested = dict(
+        Holding.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(invested=Sum(F('shares') * F('avg_cost')))
+        .values_list('user_id', 'invested')
+    )
+    return {user_id: float(invested.get(user_id) or 0) for user_id in user_ids}
+
+
+def _trader_stats(user, total_invested):
+    """Stats dict for a user row, given the cost basis of their open holdings."""
+    total_sells, winning_sells = user.total_sells, user.winning_sells
 
     # Portfolio return %
     initial = float(user.initial_balance) if user.initial_balance > 0 else 100000
-    net_worth = float(user.buying_power) + total_invested
+    net_worth = float(user.buying_power) + float(total_invested)
     portfolio_return = ((net_worth - initial) / initial) * 100
 
     win_rate = (winning_sells / total_sells * 100) if total_sells > 0 else 0
 
     return {
         'portfolioReturn': round(portfolio_return, 2),
-        'realizedProfit': round(realized_profit, 2),
-        'totalTrades': total_trades,
+        'realizedProfit': round(float(user.realized_profit), 2),
+        'totalTrades': user.total_trades,
         'winRate': round(win_rate, 1),
     }
 
 
+# Columns read when rendering a user on the leaderboard / friends list and
+# computing their trader stats (initials is derived from name)
+PUBLIC_TRADER_FIELDS = (
+    'id', 'name', 'username', 'avatar_url', 'level', 'rank', 'xp',
+    'buying_power', 'initial_balance',
+    'total_trades', 'total_sells', 'winning_sells', 'realized_profit',
+)
+
+
+def _accepted_friendships(user):
+    """Accepted friendships of a user, annotated with the other side's id as partner_id."""
+    return Friendship.objects.filter(
+        Q(from_user=user) | Q(to_user=user),
+        status='accepted',
+    ).annotate(
+        partner_id=Case(When(from_user_id=user.id, then=F('to_user_id')), default=F('from_user_id')),
+    )
+
+
+def _invested_value_expr():
+    """SQL twin of _invested_by_user: the cost basis of the user's open holdings."""
+    invested = Holding.objects.filter(user=OuterRef('pk')).values('user').annotate(
+        value=Sum(F('shares') * F('avg_cost')),
+    ).values('value')
+    return Coalesce(Subquery(invested), Value(Decimal('0')), output_field=DecimalField())
+
+
+def _portfolio_return_expr(invested=None):
+    """
+    SQL twin of compute_trader_stats' portfolioReturn, for ordering in the database.
+    Pass `invested` to reuse an already annotated invested value.
+    """
+    if invested is None:
+        invested = _invested_value_expr()
+    initial = Case(
+        When(initial_balance__gt=0, then=F('initial_balance')),
+        default=Value(Decimal('100000')),
+    )
+    return ExpressionWrapper(
+        (F('buying_power') + invested - initial) * 100 / initial,
+        output_field=DecimalField(),
+    )
+
+
+def _win_rate_expr():
+    """SQL twin of compute_trader_stats' winRate, for ordering in the database."""
+    return Case(
+        When(total_sells=0, then=Value(0.0)),
+        default=Cast('winning_sells', FloatField()) * 100 / Cast('total_sells', FloatField()),
+        output_field=FloatField(),
+    )
+
+
+# sort param -> (column or annotation name, annotation factory or None)
+LEADERBOARD_ORDERING = {
+    'portfolio_return': ('portfolio_return_pct', lambda: _portfolio_return_expr(F('invested_value'))),
+    'realized_profit': ('realized_profit', None),
+    'total_trades': ('total_trades', None),
+    'win_rate': ('win_rate_pct', _win_rate_expr),
+    'xp': ('xp', None),
+}
+
+
 class LeaderboardView(APIView):
     """Public leaderboard endpoint. Auth is optional (allows friend-scoped queries)."""
     permission_classes = []
 
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 100
+
     def get(self, request):
         sort_by = request.query_params.get('sort', 'portfolio_return')
-        limit = min(int(request.query_params.get('limit', 50)), 100)
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        limit = max(0, min(limit, self.MAX_LIMIT))
         scope = request.query_params.get('scope', 'global')
 
         # Get current user if authenticated
@@ -1186,56 +1381,39 @@ class LeaderboardView(APIView):
         except Exception:
             pass
 
-        # Get users based on scope
+        # Get users based on scope (friend ids stay a subquery: no extra round-trip)
         if scope == 'friends' and current_user:
-            friend_ids = set()
-            friendships = Friendship.objects.filter(
-                Q(from_user=current_user) | Q(to_user=current_user),
-                status='accepted',
-            )
-            for f in friendships:
-                friend_ids.add(f.to_user_id if f.from_user_id == current_user.id else f.from_user_id)
-            friend_ids.add(current_user.id)
-            users = UserProfile.objects.filter(id__in=friend_ids)
+            friend_ids = _accepted_friendships(current_user).values('partner_id')
+            users = UserProfile.objects.filter(Q(id__in=friend_ids) | Q(id=current_user.id))
         else:
             users = UserProfile.objects.all()
-        entries = []
-
-        for user in users:
-            stats = compute_trader_stats(user)
-            if stats['totalTrades'] == 0:
-                continue
-
-            entries.append({
-                'userId': str(user.id),
-                'name': user.name,
-                'username': user.username,
-                'initials': user.initials,
-                'avatarUrl': f'/media/{user.avatar_url}' if user.avatar_url and not user.avatar_url.startswith(('http://', 'https://')) else (user.avatar_url or None),
-                'level': user.level,
-                'rank': user.rank,
-                'xp': user.xp,
-                **stats,
-                'isCurrentUser': str(user.id) == current_user_id,
-            })
-
-        # Sort
-        sort_keys = {
-            'portfolio_return': lambda e: e['portfolioReturn'],
-            'realized_profit': lambda e: e['realizedProfit'],
-            'total_trades': lambda e: e['totalTrades'],
-            'win_rate': lambda e: e['winRate'],
-            'xp': lambda e: e['xp'],
-        }
-        sort_fn = sort_keys.get(sort_by, sort_keys['portfolio_return'])
-        entries.sort(key=sort_fn, reverse=True)
-
-        # Add position numbers
-        for i, entry in enumerate(entries):
-            entry['position'] = i + 1
+        # Entry stats are built from these same rows, so they always agree with
+        # the filter and the ordering
+        traders = users.filter(total_trades__gt=0).annotate(invested_value=_invested_value_expr())
+        order_field, annotation = LEADERBOARD_ORDERING.get(sort_by, LEADERBOARD_ORDERING['portfolio_return'])
+        if annotation is not None:
+            traders = traders.annotate(**{order_field: annotation()})
+        # COUNT(*) OVER () is evaluated before LIMIT, so the page carries the total
+        users = list(
+            traders.only(*PUBLIC_TRADER_FIELDS)
+            .annotate(total_traders=Window(Count('id')))
+            .order_by(f'-{order_field}', 'username')[:limit]
+        )
+        total_traders = users[0].total_traders if users else traders.count()
 
-        total_traders = len(entries)
-        entries = entries[:limit]
+        entries = [{
+            'userId': str(user.id),
+            'name': user.name,
+            'username': user.username,
+            'initials': user.initials,
+            'avatarUrl': user.avatar_public_url,
+            'level': user.level,
+            'rank': user.rank,
+            'xp': user.xp,
+            **_trader_stats(user, user.invested_value),
+            'isCurrentUser': str(user.id) == current_user_id,
+            'position': position,
+        } for position, user in enumerate(users, start=1)]
 
         return Response({
             'leaderboard': entries,
@@ -1257,26 +1435,22 @@ class PublicProfileView(APIView):
         stats = compute_trader_stats(user)
 
         # Get achievements
-        all_achievements = Achievement.objects.all()
-        user_achievements = UserAchievement.objects.filter(user=user).select_related('achievement')
-        unlocked_ids = set(ua.achievement_id for ua in user_achievements)
-
-        achievements = []
-        for ach in all_achievements:
-            achievements.append({
-                **ach.to_dict(),
-                'unlocked': ach.id in unlocked_ids,
-                'unlockedAt': next(
-                    (ua.unlocked_at.isoformat() for ua in user_achievements if ua.achievement_id == ach.id),
-                    None
-                ),
-            })
+        unlocked_map = {
+            achievement_id: unlocked_at.isoformat()
+            for achievement_id, unlocked_at in UserAchievement.objects.filter(user=user)
+            .values_list('achievement_id', 'unlocked_at')
+        }
+        achievements = [{
+            **ach.to_dict(),
+            'unlocked': ach.id in unlocked_map,
+            'unlockedAt': unlocked_map.get(ach.id),
+        } for ach in Achievement.catalogue()]
 
         return Response({
             'username': user.username,
             'name': user.name,
             'initials': user.initials,
-            'avatarUrl': f'/media/{user.avatar_url}' if user.avatar_url and not user.avatar_url.startswith(('http://', 'https://')) else (user.avatar_url or None),
+            'avatarUrl': user.avatar_public_url,
             'level': user.level,
             'rank': user.rank,
             'xp': user.xp,
@@ -1293,21 +1467,22 @@ class FriendsListView(APIView):
         user = get_user(request)
 
         # Accepted friendships
-        accepted = Friendship.objects.filter(
-            Q(from_user=user) | Q(to_user=user),
-            status='accepted',
-        ).select_related('from_user', 'to_user')
+        accepted = list(_accepted_friendships(user).values_list('id', 'partner_id'))
+        users_by_id = UserProfile.objects.only(*PUBLIC_TRADER_FIELDS).in_bulk(
+            [partner_id for _, partner_id in accepted]
+        )
+        stats_by_user = compute_trader_stats_bulk(users_by_id.values())
 
         friends = []
-        for f in accepted:
-            friend_user = f.to_user if f.from_user_id == user.id else f.from_user
-            stats = compute_trader_stats(friend_user)
+        for friendship_id, partner_id in accepted:
+            friend_user = users_by_id[partner_id]
+            stats = stats_by_user[partner_id]
             friends.append({
-                'friendshipId': str(f.id),
+                'friendshipId': str(friendship_id),
                 'username': friend_user.username,
                 'name': friend_user.name,
                 'initials': friend_user.initials,
-                'avatarUrl': f'/media/{friend_user.avatar_url}' if friend_user.avatar_url and not friend_user.avatar_url.startswith(('http://', 'https://')) else (friend_user.avatar_url or None),
+                'avatarUrl': friend_user.avatar_public_url,
                 'level': friend_user.level,
                 'rank': friend_user.rank,
                 **stats,
@@ -1322,7 +1497,7 @@ class FriendsListView(APIView):
             'username': f.from_user.username,
             'name': f.from_user.name,
             'initials': f.from_user.initials,
-            'avatarUrl': f'/media/{f.from_user.avatar_url}' if f.from_user.avatar_url and not f.from_user.avatar_url.startswith(('http://', 'https://')) else (f.from_user.avatar_url or None),
+            'avatarUrl': f.from_user.avatar_public_url,
             'level': f.from_user.level,
             'rank': f.from_user.rank,
             'createdAt': f.created_at.isoformat(),
@@ -1337,7 +1512,7 @@ class FriendsListView(APIView):
             'username': f.to_user.username,
             'name': f.to_user.name,
             'initials': f.to_user.initials,
-            'avatarUrl': f'/media/{f.to_user.avatar_url}' if f.to_user.avatar_url and not f.to_user.avatar_url.startswith(('http://', 'https://')) else (f.to_user.avatar_url or None),
+            'avatarUrl': f.to_user.avatar_public_url,
             'level': f.to_user.level,
             'rank': f.to_user.rank,
             'createdAt': f.created_at.isoformat(),
@@ -1365,24 +1540,42 @@ class SendFriendRequestView(APIView):
         except UserProfile.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Check for existing friendship in either direction
+        # Insert first: the pair constraint rejects a request if a friendship already
+        # exists in either direction, so the common case is a single INSERT.
+        try:
+            with transaction.atomic():
+                friendship = Friendship.objects.create(from_user=user, to_user=target)
+            return Response({'status': 'pending', 'friendshipId': str(friendship.id)}, status=status.HTTP_201_CREATED)
+        except IntegrityError:
+            pass
+
         existing = Friendship.objects.filter(
             Q(from_user=user, to_user=target) | Q(from_user=target, to_user=user)
-        ).first()
-
-        if existing:
-            if existing.status == 'accepted':
-                return Response({'error': 'Already friends'}, status=status.HTTP_400_BAD_REQUEST)
-            if existing.from_user_id == user.id and existing.status == 'pending':
+        ).only('id', 'status', 'from_user', 'to_user').first()
+        if existing is None:
+            # Removed between the failed insert and this lookup; if yet another
+            # request re-inserts the pair first, treat it as a duplicate
+            try:
+                with transaction.atomic():
+                    friendship = Friendship.objects.create(from_user=user, to_user=target)
+            except IntegrityError:
                 return Response({'error': 'Friend request already sent'}, status=status.HTTP_400_BAD_REQUEST)
-            # Auto-accept: target had a pending request to us
-            if existing.from_user_id == target.id and existing.status == 'pending':
-                existing.status = 'accepted'
-                existing.save()
-                return Response({'status': 'accepted', 'friendshipId': str(existing.id)})
+            return Response({'status': 'pending', 'friendshipId': str(friendship.id)}, status=status.HTTP_201_CREATED)
+
+        if existing.status == 'accepted':
+            return Response({'error': 'Already friends'}, status=status.HTTP_400_BAD_REQUEST)
+        if existing.from_user_id == user.id and existing.status == 'pending':
+            return Response({'error': 'Friend request already sent'}, status=status.HTTP_400_BAD_REQUEST)
+        # Auto-accept: target had a pending request to us
+        if existing.from_user_id == target.id and existing.status == 'pending':
+            existing.status = 'accepted'
+            existing.save(update_fields=['status', 'updated_at'])
+            return Response({'status': 'accepted', 'friendshipId': str(existing.id)})
 
-        friendship = Friendship.objects.create(from_user=user, to_user=target)
-        return Response({'status': 'pending', 'friendshipId': str(friendship.id)}, status=status.HTTP_201_CREATED)
+        # A stale rejected row: turn it into a fresh request from this user
+        existing.from_user, existing.to_user, existing.status = user, target, 'pending'
+        existing.save(update_fields=['from_user', 'to_user', 'status', 'updated_at'])
+        return Response({'status': 'pending', 'friendshipId': str(existing.id)}, status=status.HTTP_201_CREATED)
 
 
 class RespondFriendRequestView(APIView):
@@ -1396,13 +1589,15 @@ class RespondFriendRequestView(APIView):
             return Response({'error': 'Action must be accept or reject'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            friendship = Friendship.objects.get(id=friendship_id, to_user=user, status='pending')
+            friendship = Friendship.objects.only('id', 'status').get(
+                id=friendship_id, to_user=user, status='pending',
+            )
         except Friendship.DoesNotExist:
             return Response({'error': 'Friend request not found'}, status=status.HTTP_404_NOT_FOUND)
 
         if action == 'accept':
             friendship.status = 'accepted'
-            friendship.save()
+            friendship.save(update_fields=['status', 'updated_at'])
             return Response({'success': True, 'status': 'accepted'})
         else:
             friendship.delete()
@@ -1415,15 +1610,13 @@ class RemoveFriendView(APIView):
     def delete(self, request, friendship_id):
         user = get_user(request)
 
-        try:
-            friendship = Friendship.objects.get(
-                Q(from_user=user) | Q(to_user=user),
-                id=friendship_id,
-            )
-        except Friendship.DoesNotExist:
+        deleted, _ = Friendship.objects.filter(
+            Q(from_user=user) | Q(to_user=user),
+            id=friendship_id,
+        ).delete()
+        if not deleted:
             return Response({'error': 'Friendship not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        friendship.delete()
         return Response({'success': True})
 
 
@@ -1443,7 +1636,7 @@ class FriendshipStatusView(APIView):
 
         friendship = Friendship.objects.filter(
             Q(from_user=user, to_user=target) | Q(from_user=target, to_user=user)
-        ).first()
+        ).only('id', 'status', 'from_user').first()
 
         if not friendship:
             return Response({'status': 'none'})
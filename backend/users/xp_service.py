@@ -2,7 +2,9 @@
 XP and Rank service for paper trading app.
 """
 
-from .models import Holding, Trade, UserAchievement
+from bisect import bisect_right
+
+from .models import Holding, UserAchievement
 
 # Rank ladder: (level, title, xp_required)
 RANK_LADDER = [
@@ -15,6 +17,10 @@ RANK_LADDER = [
     (7, 'Wall Street Legend', 30000),
 ]
 
+# Parallel lookups for bisecting on XP
+_THRESHOLDS = [required for _, _, required in RANK_LADDER]
+_RANK_LOOKUP = [(level, title) for level, title, _ in RANK_LADDER]
+
 # XP award amounts
 XP_TRADE_EXECUTED = 25
 XP_FIRST_TRADE_BONUS = 75
@@ -26,11 +32,7 @@ XP_10_HOLDINGS = 250
 
 def get_rank_for_xp(xp):
     """Return (level, rank_title) for a given XP amount."""
-    result_level, result_rank = 1, 'Retail Trader'
-    for level, title, required in RANK_LADDER:
-        if xp >= required:
-            result_level, result_rank = level, title
-    return result_level, result_rank
+    return _RANK_LOOKUP[max(bisect_right(_THRESHOLDS, xp) - 1, 0)]
 
 
 def award_xp(user, amount):
@@ -50,9 +52,8 @@ def award_trade_xp(user, trade_type, sell_price=None, avg_buy_price=None):
     # Base XP for executing a trade
     xp_gained += XP_TRADE_EXECUTED
 
-    # First trade bonus
-    trade_count = Trade.objects.filter(user=user).count()
-    if trade_count == 1:
+    # First trade bonus (total_trades already includes this trade, see trader_stats.record_trade)
+    if user.total_trades == 1:
         xp_gained += XP_FIRST_TRADE_BONUS
 
     # Profitable sell bonus
@@ -94,13 +95,14 @@ def get_rank_info(user):
 
 def get_next_rank_info(xp):
     """Get info about the next rank."""
-    for level, title, required in RANK_LADDER:
-        if xp < required:
-            return {
-                'level': level,
-                'rank': title,
-                'xpRequired': required,
-                'xpRemaining': required - xp,
-            }
-    # Already at max rank
-    return None
+    idx = bisect_right(_THRESHOLDS, xp)
+    if idx == len(RANK_LADDER):
+        # Already at max rank
+        return None
+    level, title, required = RANK_LADDER[idx]
+    return {
+        'level': level,
+        'rank': title,
+        'xpRequired': required,
+        'xpRemaining': required - xp,
+    }